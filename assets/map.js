@@ -4,11 +4,21 @@ L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
     attribution: '&copy; OpenStreetMap contributors'
 }).addTo(map);
 
+const CLUSTER_MAX_ZOOM = 11;
+const MARKER_FIELDS = "id,title,lat,lng,status";
+
 let leafletMarkers = {};
+const clusterLayer = L.layerGroup().addTo(map);
 let currentRequestId = null;
 let currentUser = null;
 let isAdmin = false;
-let requestsCache = [];
+let requestsCache = {};
+let syncVersion = null;
+let syncQuery = null;
+let pollTimer = null;
+let pushConnected = false;
+let refreshQueued = false;
+let complaintsCursor = null;
 let selectedUserForDeletion = null;
 
 function escapeHtml(value) {
@@ -20,15 +30,45 @@ function escapeHtml(value) {
         .replaceAll("'", "&#039;");
 }
 
+function viewportQuery() {
+    const bounds = map.getBounds();
+    const params = new URLSearchParams({
+        south: bounds.getSouth().toFixed(5),
+        west: bounds.getWest().toFixed(5),
+        north: bounds.getNorth().toFixed(5),
+        east: bounds.getEast().toFixed(5),
+    });
+    return params.toString();
+}
+
 async function loadMarkers() {
 
-    const response = await fetch('/api/requests');
-    const result = await response.json();
+    const zoom = map.getZoom();
+    const clustered = zoom <= CLUSTER_MAX_ZOOM;
+    const query = clustered
+        ? `zoom=${zoom}&${viewportQuery()}`
+        : `${viewportQuery()}&fields=${MARKER_FIELDS}&layout=columns`;
+    const params = new URLSearchParams(query);
+    if (syncVersion !== null && query === syncQuery) {
+        params.set("since", syncVersion);
+    }
 
-    const data = result.requests;
-    currentUser = result.current_user;
-    isAdmin = Boolean(result.is_admin);
-    requestsCache = Array.isArray(data) ? data : [];
+    const endpoint = clustered ? "/api/requests/clusters" : "/api/requests";
+    const response = await fetch(`${endpoint}?${params}`);
+    if (response.status !== 304) {
+        const result = await response.json();
+        currentUser = result.current_user;
+        isAdmin = Boolean(result.is_admin);
+        if (clustered) {
+            Object.keys(leafletMarkers).forEach(removeMarker);
+            renderClusters(result.clusters);
+        } else {
+            clusterLayer.clearLayers();
+            applyRequests(result);
+        }
+        syncVersion = result.version;
+        syncQuery = query;
+    }
 
     const openComplaintsBtn = document.getElementById("openComplaintsBtn");
     const closeComplaintsBtn = document.getElementById("closeComplaintsBtn");
@@ -44,81 +84,163 @@ async function loadMarkers() {
     }
 
     if (isAdmin) {
-        await loadComplaints();
+        if (!pushConnected) {
+            await loadComplaints();
+        }
     } else {
         closeComplaintsSidebar();
         closeUserAdminPanel();
     }
+}
 
-    if (!Array.isArray(data)) return;
+function renderClusters(clusters) {
+
+    clusterLayer.clearLayers();
+
+    (clusters || []).forEach(cluster => {
+        const size = cluster.count < 10 ? 30 : cluster.count < 100 ? 38 : 46;
+        const statuses = Object.entries(cluster.statuses)
+            .map(([status, count]) => `${escapeHtml(status)}: ${count}`)
+            .join("<br>");
+
+        L.marker([cluster.lat, cluster.lng], {
+            icon: L.divIcon({
+                className: "request-cluster",
+                html: `<span>${cluster.count}</span>`,
+                iconSize: [size, size],
+            }),
+        })
+            .bindTooltip(statuses)
+            .on("click", () => {
+                map.setView([cluster.lat, cluster.lng], Math.min(map.getZoom() + 2, CLUSTER_MAX_ZOOM + 1));
+            })
+            .addTo(clusterLayer);
+    });
+}
 
-    const activeIds = data.map(r => r.id);
+function requestPopup(req) {
+    return `
+        <b>${escapeHtml(req.title)}</b><br>
+        Статус: ${escapeHtml(req.status)}<br>
+        <button onclick="openDetails(${req.id})">
+            Відкрити деталі
+        </button>
+    `;
+}
 
-    Object.keys(leafletMarkers).forEach(id => {
-        if (!activeIds.includes(Number(id))) {
-            map.removeLayer(leafletMarkers[id]);
-            delete leafletMarkers[id];
-        }
-    });
+function removeMarker(id) {
+    if (leafletMarkers[id]) {
+        map.removeLayer(leafletMarkers[id]);
+        delete leafletMarkers[id];
+    }
+    delete requestsCache[id];
+}
 
-    data.forEach(req => {
+function rowsFromColumns(columns) {
+    const fields = Object.keys(columns || {});
+    const count = fields.length ? columns[fields[0]].length : 0;
+    return Array.from({ length: count }, (_, index) =>
+        Object.fromEntries(fields.map(field => [field, columns[field][index]]))
+    );
+}
 
-        if (leafletMarkers[req.id]) {
+function applyRequests(result) {
 
-            leafletMarkers[req.id].setPopupContent(`
-                <b>${escapeHtml(req.title)}</b><br>
-                Статус: ${escapeHtml(req.status)}<br>
-                <button onclick="openDetails(${req.id})">
-                    Відкрити деталі
-                </button>
-            `);
+    const data = result.columns ? rowsFromColumns(result.columns) : (result.requests || []);
 
-        } else {
+    if (result.full) {
+        const activeIds = new Set(data.map(r => r.id));
+        Object.keys(leafletMarkers).forEach(id => {
+            if (!activeIds.has(Number(id))) {
+                removeMarker(id);
+            }
+        });
+    }
+
+    (result.deleted || []).forEach(removeMarker);
+
+    data.forEach(req => {
+
+        requestsCache[req.id] = req;
 
-            const marker = L.marker([req.lat, req.lng])
+        if (leafletMarkers[req.id]) {
+            leafletMarkers[req.id].setPopupContent(requestPopup(req));
+        } else {
+            leafletMarkers[req.id] = L.marker([req.lat, req.lng])
                 .addTo(map)
-                .bindPopup(`
-                    <b>${escapeHtml(req.title)}</b><br>
-                    Статус: ${escapeHtml(req.status)}<br>
-                    <button onclick="openDetails(${req.id})">
-                        Відкрити деталі
-                    </button>
-                `);
-
-            leafletMarkers[req.id] = marker;
+                .bindPopup(requestPopup(req));
         }
     });
-    
 
-    if (currentRequestId) {
+    const sidebarOpen = document.getElementById("sidebar").classList.contains("active");
+    if (sidebarOpen && data.some(req => Number(req.id) === Number(currentRequestId))) {
+        openDetails(currentRequestId);
+    }
+}
+function startPolling() {
+    if (!pollTimer) {
+        pollTimer = setInterval(loadMarkers, 3000);
+    }
+}
+
+function stopPolling() {
+    if (pollTimer) {
+        clearInterval(pollTimer);
+        pollTimer = null;
+    }
+}
 
-        const currentReq = data.find(r => r.id === currentRequestId);
+function scheduleRefresh() {
+    if (refreshQueued) return;
+    refreshQueued = true;
+    setTimeout(() => {
+        refreshQueued = false;
+        loadMarkers();
+    }, 100);
+}
 
-        if (currentReq) {
+function connectEvents() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
 
-            document.getElementById("detail-status").innerText = currentReq.status;
+    const source = new EventSource("/api/events");
 
-            updateSidebarUI(currentReq, currentUser, isAdmin);
+    source.addEventListener("open", async () => {
+        pushConnected = true;
+        stopPolling();
+        await loadMarkers();
+        if (isAdmin) {
+            await loadComplaints();
         }
-    }
+    });
+    source.addEventListener("requests", scheduleRefresh);
+    source.addEventListener("complaints", () => {
+        if (isAdmin) loadComplaints();
+    });
+    source.addEventListener("error", () => {
+        pushConnected = false;
+        startPolling();
+    });
 }
-setInterval(loadMarkers, 3000);
+
+map.on("moveend", loadMarkers);
 loadMarkers();
+connectEvents();
 
 async function openDetails(id) {
 
     currentRequestId = id;
 
-    const response = await fetch('/api/requests');
+    const response = await fetch(`/api/requests/${id}`);
     const result = await response.json();
+    if (result.error) return;
 
-    const data = result.requests;
+    const req = result.request;
     currentUser = result.current_user;
     isAdmin = Boolean(result.is_admin);
 
-    const req = data.find(r => Number(r.id) === Number(id));
-    if (!req) return;
-
     document.getElementById("detail-title").innerText = req.title;
     document.getElementById("detail-description").innerText = req.description;
     document.getElementById("detail-status").innerText = req.status;
@@ -137,6 +259,16 @@ async function cancelRequest() {
     await loadMarkers();
 }
 
+async function completeRequest() {
+    const response = await fetch(`/api/requests/${currentRequestId}/complete`, { method: "POST" });
+    const result = await response.json();
+    if (result.error) {
+        alert(result.error);
+        return;
+    }
+    await loadMarkers();
+}
+
 async function deleteRequestByAdmin() {
     const reason = prompt("Вкажіть причину видалення запиту:");
     if (!reason || !reason.trim()) return;
@@ -204,6 +336,7 @@ function openComplaintsSidebar() {
     const openBtn = document.getElementById("openComplaintsBtn");
     const closeBtn = document.getElementById("closeComplaintsBtn");
 
+    closeNearbySidebar();
     if (sidebar) sidebar.classList.add("active");
 
     if (openBtn) openBtn.style.display = "none";
@@ -299,20 +432,76 @@ async function deleteUserByAdmin() {
     await loadComplaints();
 }
 
-async function loadComplaints() {
-    const response = await fetch("/api/complaints");
+function loadNearby() {
+    if (!navigator.geolocation) {
+        alert("Геолокація недоступна у цьому браузері.");
+        return;
+    }
+
+    navigator.geolocation.getCurrentPosition(async (position) => {
+        const { latitude, longitude } = position.coords;
+        const params = new URLSearchParams({
+            lat: latitude.toFixed(5),
+            lng: longitude.toFixed(5),
+        });
+        const response = await fetch(`/api/requests/nearby?${params}`);
+        const result = await response.json();
+        if (result.error) {
+            alert(result.error);
+            return;
+        }
+
+        const container = document.getElementById("nearbyList");
+        if (!Array.isArray(result.requests) || result.requests.length === 0) {
+            container.innerHTML = "<p>Поруч немає відкритих запитів.</p>";
+        } else {
+            container.innerHTML = result.requests
+                .map((req) => `
+                    <div class="complaint-card nearby-card" onclick="focusNearby(${req.id}, ${req.lat}, ${req.lng})">
+                        <p><b>${escapeHtml(req.title)}</b></p>
+                        <p>${escapeHtml(req.description)}</p>
+                        <p>${req.distance_km.toFixed(1)} км</p>
+                    </div>
+                `)
+                .join("");
+        }
+
+        closeComplaintsSidebar();
+        document.getElementById("nearbySidebar").classList.add("active");
+        map.setView([latitude, longitude], Math.max(map.getZoom(), CLUSTER_MAX_ZOOM + 1));
+    }, () => alert("Не вдалося визначити локацію."));
+}
+
+function focusNearby(id, lat, lng) {
+    map.setView([lat, lng], Math.max(map.getZoom(), CLUSTER_MAX_ZOOM + 2));
+    openDetails(id);
+}
+
+function closeNearbySidebar() {
+    document.getElementById("nearbySidebar").classList.remove("active");
+}
+
+async function loadComplaints(append = false) {
+    const params = new URLSearchParams();
+    if (append && complaintsCursor !== null) {
+        params.set("cursor", complaintsCursor);
+    }
+    const response = await fetch(`/api/complaints?${params}`);
     const result = await response.json();
     if (result.error) return;
 
     const container = document.getElementById("complaintsList");
     if (!container) return;
 
-    if (!Array.isArray(result.complaints) || result.complaints.length === 0) {
+    complaintsCursor = result.next_cursor ?? null;
+    container.querySelector(".complaints-more-btn")?.remove();
+
+    if (!append && (!Array.isArray(result.complaints) || result.complaints.length === 0)) {
         container.innerHTML = "<p>Скарг поки немає.</p>";
         return;
     }
 
-    container.innerHTML = result.complaints
+    const cards = result.complaints
         .map((complaint) => `
             <div class="complaint-card">
                 <p><b>Надіслав:</b> ${escapeHtml(complaint.sender_email)}</p>
@@ -322,6 +511,15 @@ async function loadComplaints() {
             </div>
         `)
         .join("");
+    const more = complaintsCursor !== null
+        ? `<button class="complaints-more-btn" onclick="loadComplaints(true)">Показати ще</button>`
+        : "";
+
+    if (append) {
+        container.insertAdjacentHTML("beforeend", cards + more);
+    } else {
+        container.innerHTML = cards + more;
+    }
 }
 
 async function deleteComplaint(complaintId) {
@@ -339,6 +537,7 @@ function updateSidebarUI(req, currentUser, isAdmin) {
     const acceptBtn = document.getElementById("acceptBtn");
     const cancelBtn = document.getElementById("cancelBtn");
     const contactsBtn = document.getElementById("contactsBtn");
+    const completeBtn = document.getElementById("completeBtn");
     const deleteBtn = document.getElementById("deleteBtn");
     const reportBtn = document.getElementById("reportBtn");
 
@@ -371,8 +570,10 @@ function updateSidebarUI(req, currentUser, isAdmin) {
          currentUser === req.accepted_by)
     ) {
         contactsBtn.style.display = "block";
+        completeBtn.style.display = "block";
     } else {
         contactsBtn.style.display = "none";
+        completeBtn.style.display = "none";
     }
 
     deleteBtn.style.display = isAdmin ? "block" : "none";
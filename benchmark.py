@@ -0,0 +1,384 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+BENCH_PASSWORD = "benchpass1"
+BENCH_AREA = (44.4, 22.1, 52.4, 40.2)
+VIEWPORT_SPAN = (0.5, 1.0)
+REGISTER_CONCURRENCY = 16
+RACE_RETRY_SECONDS = 0.2
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def use_scratch_database(tmp: str):
+    # main and datalayer open their databases at import time, so point them at scratch files first.
+    # Overwrite rather than setdefault: an in-process run must never write into a real deployment's files.
+    os.environ["UNIFIED_DB_PATH"] = str(Path(tmp) / "bench.db")
+    os.environ["SESSION_DB_PATH"] = str(Path(tmp) / "sessions.db")
+    os.environ["SECRET_KEY_PATH"] = str(Path(tmp) / "session_secret")
+
+
+def write_results(path: Optional[str], results: dict):
+    if path:
+        Path(path).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"results written to {path}")
+
+
+async def accept_race(service, helpers: int) -> tuple[int, list[float]]:
+    request_id = await service.create("Benchmark", "Contention round", 50.45, 30.52, "author@bench.local")
+
+    async def helper(slot: int):
+        started = time.perf_counter()
+        result = await service.accept(request_id, f"helper{slot}@bench.local")
+        return result, time.perf_counter() - started
+
+    outcomes = await asyncio.gather(*(helper(slot) for slot in range(helpers)))
+
+    winners = sum(1 for result, _latency in outcomes if result.get("success"))
+    return winners, [latency for _result, latency in outcomes]
+
+
+async def run_accept_contention(sizes: list[int], rounds: int, output: Optional[str] = None) -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        use_scratch_database(tmp)
+        from main import Database, RequestService
+
+        db = Database(f"sqlite:///{Path(tmp) / 'accept.db'}")
+        service = RequestService(db)
+        print(f"{'helpers':>8} {'rounds':>7} {'winners':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+        ok = True
+        rows = []
+        for helpers in sizes:
+            latencies: list[float] = []
+            winner_counts = set()
+            for _ in range(rounds):
+                winners, round_latencies = await accept_race(service, helpers)
+                winner_counts.add(winners)
+                latencies.extend(round_latencies)
+            ok = ok and winner_counts == {1}
+            rows.append({
+                "helpers": helpers,
+                "rounds": rounds,
+                "winners": sorted(winner_counts),
+                "p50_ms": percentile(latencies, 0.50) * 1000,
+                "p95_ms": percentile(latencies, 0.95) * 1000,
+                "max_ms": max(latencies) * 1000,
+            })
+            print(
+                f"{helpers:>8} {rounds:>7} {','.join(map(str, sorted(winner_counts))):>8} "
+                f"{percentile(latencies, 0.50) * 1000:>8.2f} "
+                f"{percentile(latencies, 0.95) * 1000:>8.2f} "
+                f"{max(latencies) * 1000:>8.2f}"
+            )
+        print("exactly one winner per round" if ok else "FAILED: some rounds did not have exactly one winner")
+        await db.async_engine.dispose()
+        write_results(output, {"benchmark": "accept", "ok": ok, "sizes": rows})
+        return ok
+
+
+class RouteStats:
+    """Collects per-route latencies and response statuses for a load run."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+
+    async def call(self, client: httpx.AsyncClient, method: str, route: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as exc:
+            self.latencies[route].append(time.perf_counter() - started)
+            self.statuses[route][type(exc).__name__] += 1
+            return None
+        self.latencies[route].append(time.perf_counter() - started)
+        self.statuses[route][str(response.status_code)] += 1
+        return response
+
+    def summary(self, elapsed: float) -> dict:
+        routes = {}
+        for route in sorted(self.latencies):
+            samples = self.latencies[route]
+            routes[route] = {
+                "requests": len(samples),
+                "rps": len(samples) / elapsed,
+                "p50_ms": percentile(samples, 0.50) * 1000,
+                "p95_ms": percentile(samples, 0.95) * 1000,
+                "p99_ms": percentile(samples, 0.99) * 1000,
+                "max_ms": max(samples) * 1000,
+                "statuses": dict(self.statuses[route]),
+            }
+        return routes
+
+
+def print_routes(routes: dict):
+    width = max([len(route) for route in routes] + [5])
+    print(f"{'route':<{width}} {'reqs':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}  statuses")
+    for route, row in routes.items():
+        statuses = " ".join(f"{status}:{count}" for status, count in sorted(row["statuses"].items()))
+        print(
+            f"{route:<{width}} {row['requests']:>7} {row['rps']:>8.1f} {row['p50_ms']:>8.2f} "
+            f"{row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['max_ms']:>8.2f}  {statuses}"
+        )
+
+
+class LoadTest:
+    """Drives map pollers, accept/cancel races, login bursts and admin complaint polling against one app."""
+
+    def __init__(self, args: argparse.Namespace, transport: Optional[httpx.AsyncBaseTransport], base_url: str):
+        self.args = args
+        self.transport = transport
+        self.base_url = base_url
+        self.stats = RouteStats()
+        self.rng = random.Random(args.seed)
+        self.run_id = int(time.time())
+        self.users: list[str] = []
+        self.race_rounds = 0
+        self.race_violations = 0
+        self._clients: list[httpx.AsyncClient] = []
+
+    def client(self) -> httpx.AsyncClient:
+        client = httpx.AsyncClient(
+            transport=self.transport,
+            base_url=self.base_url,
+            follow_redirects=False,
+            timeout=self.args.timeout,
+        )
+        self._clients.append(client)
+        return client
+
+    async def close(self):
+        await asyncio.gather(*(client.aclose() for client in self._clients))
+
+    async def login(self, client: httpx.AsyncClient, email: str, password: str = BENCH_PASSWORD):
+        return await self.stats.call(client, "POST", "POST /login", "/login", data={"email": email, "password": password})
+
+    async def setup(self):
+        needed = max(self.args.racers + 1, self.args.logins)
+        emails = [f"bench{self.run_id}-{index}@bench.local" for index in range(needed)]
+        gate = asyncio.Semaphore(REGISTER_CONCURRENCY)
+
+        async def register(email: str):
+            async with gate:
+                response = await self.stats.call(self.client(), "POST", "POST /register", "/register", data={
+                    "surname": "Bench",
+                    "name": "User",
+                    "patronymic": "Load",
+                    "gender": "male",
+                    "phone_code": "+380",
+                    "phone": "0991234567",
+                    "email": email,
+                    "password": BENCH_PASSWORD,
+                })
+            if response is not None and response.status_code == 302:
+                self.users.append(email)
+
+        await asyncio.gather(*(register(email) for email in emails))
+        if len(self.users) < self.args.racers + 1:
+            raise RuntimeError(f"registered only {len(self.users)} of {needed} benchmark users")
+
+        self.admin = self.client()
+        await self.login(self.admin, self.args.admin_email, self.args.admin_password)
+        self.author = self.client()
+        self.racers = [self.client() for _ in range(self.args.racers)]
+        await asyncio.gather(*(
+            self.login(client, email)
+            for client, email in zip([self.author, *self.racers], self.users)
+        ))
+        if self.args.requests:
+            south, west, north, east = BENCH_AREA
+            rows = "\n".join(
+                json.dumps({
+                    "title": f"Benchmark {index}",
+                    "description": "Seeded by benchmark.py",
+                    "lat": self.rng.uniform(south, north),
+                    "lng": self.rng.uniform(west, east),
+                })
+                for index in range(self.args.requests)
+            )
+            response = await self.stats.call(
+                self.admin, "POST", "POST /api/requests/import", "/api/requests/import", content=rows.encode("utf-8")
+            )
+            if response is None or "inserted" not in response.json():
+                raise RuntimeError("could not seed requests; check the admin credentials")
+
+    async def map_client(self, deadline: float):
+        client = self.client()
+        south, west, north, east = BENCH_AREA
+        span = self.rng.uniform(*VIEWPORT_SPAN)
+        lat, lng = self.rng.uniform(south, north - span), self.rng.uniform(west, east - span)
+        params = {"south": lat, "west": lng, "north": lat + span, "east": lng + span}
+        version, etag = None, None
+        await asyncio.sleep(self.rng.uniform(0, self.args.poll_interval))
+        while time.monotonic() < deadline:
+            headers = {"If-None-Match": etag} if etag else {}
+            query = dict(params, since=version) if version is not None else params
+            response = await self.stats.call(client, "GET", "GET /api/requests", "/api/requests", params=query, headers=headers)
+            if response is not None and response.status_code == 200:
+                version, etag = response.json()["version"], response.headers.get("etag")
+            await asyncio.sleep(self.args.poll_interval)
+
+    async def race(self, deadline: float):
+        author, racers = self.author, self.racers
+        while time.monotonic() < deadline:
+            created = await self.stats.call(author, "POST", "POST /api/requests", "/api/requests", data={
+                "title": "Race",
+                "description": "Accept/cancel race",
+                "lat": 50.45,
+                "lng": 30.52,
+            })
+            if created is None or created.status_code != 200:
+                await asyncio.sleep(RACE_RETRY_SECONDS)
+                continue
+            snapshot = await self.stats.call(author, "GET", "GET /api/requests", "/api/requests", params={
+                "south": 50.44, "west": 30.51, "north": 50.46, "east": 30.53,
+            })
+            if snapshot is None or snapshot.status_code != 200:
+                await asyncio.sleep(RACE_RETRY_SECONDS)
+                continue
+            request_id = max(request["id"] for request in snapshot.json()["requests"])
+            route = "POST /api/requests/{id}/accept"
+            url = f"/api/requests/{request_id}/accept"
+            results = await asyncio.gather(*(self.stats.call(client, "POST", route, url) for client in racers))
+            winners = [
+                client for client, response in zip(racers, results)
+                if response is not None and response.status_code == 200 and response.json().get("success")
+            ]
+            self.race_rounds += 1
+            if len(winners) != 1:
+                self.race_violations += 1
+            losers = [client for client in racers if client not in winners]
+            if losers:
+                await self.stats.call(
+                    losers[0], "POST", "POST /api/requests/{id}/report", f"/api/requests/{request_id}/report",
+                    data={"complaint_text": "Benchmark complaint"},
+                )
+            cancel_route, cancel_url = "POST /api/requests/{id}/cancel", f"/api/requests/{request_id}/cancel"
+            for winner in winners:
+                await self.stats.call(winner, "POST", cancel_route, cancel_url)
+            await self.stats.call(author, "POST", cancel_route, cancel_url)
+
+    async def login_bursts(self, deadline: float):
+        while time.monotonic() < deadline:
+            emails = [self.users[index % len(self.users)] for index in range(self.args.logins)]
+            await asyncio.gather(*(self.login(self.client(), email) for email in emails))
+            await asyncio.sleep(self.args.login_interval)
+
+    async def admin_poller(self, deadline: float):
+        cursor = None
+        while time.monotonic() < deadline:
+            params = {"cursor": cursor} if cursor is not None else {}
+            response = await self.stats.call(self.admin, "GET", "GET /api/complaints", "/api/complaints", params=params)
+            if response is not None and response.status_code == 200:
+                cursor = response.json().get("next_cursor")
+            await self.stats.call(self.admin, "GET", "GET /api/complaints/summary", "/api/complaints/summary")
+            await asyncio.sleep(self.args.poll_interval)
+
+    async def run(self) -> dict:
+        await self.setup()
+        self.stats = RouteStats()
+        started = time.monotonic()
+        deadline = started + self.args.duration
+        workers = [self.map_client(deadline) for _ in range(self.args.clients)]
+        if self.args.racers:
+            workers.append(self.race(deadline))
+        if self.args.logins:
+            workers.append(self.login_bursts(deadline))
+        if self.args.admins:
+            workers.extend(self.admin_poller(deadline) for _ in range(self.args.admins))
+        await asyncio.gather(*workers)
+        elapsed = time.monotonic() - started
+        return {
+            "benchmark": "load",
+            "target": self.base_url if self.transport is None else "in-process",
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.run_id)),
+            "elapsed_seconds": elapsed,
+            "config": {
+                key: getattr(self.args, key)
+                for key in ("clients", "racers", "logins", "admins", "requests", "duration", "poll_interval", "login_interval", "seed")
+            },
+            "races": {"rounds": self.race_rounds, "violations": self.race_violations},
+            "routes": self.stats.summary(elapsed),
+        }
+
+
+@asynccontextmanager
+async def load_target(base_url: Optional[str]):
+    if base_url:
+        yield None, base_url
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        use_scratch_database(tmp)
+        from main import app
+
+        async with app.router.lifespan_context(app):
+            yield httpx.ASGITransport(app=app), "http://bench.local"
+
+
+async def run_load(args: argparse.Namespace) -> bool:
+    async with load_target(args.base_url) as (transport, base_url):
+        load = LoadTest(args, transport, base_url)
+        try:
+            results = await load.run()
+        finally:
+            await load.close()
+    print_routes(results["routes"])
+    races = results["races"]
+    ok = races["violations"] == 0
+    print(f"{races['rounds']} accept races, {races['violations']} without exactly one winner")
+    write_results(args.output, results)
+    return ok
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Help-Hub benchmarks")
+    commands = parser.add_subparsers(dest="command")
+
+    accept = commands.add_parser("accept", help="accept contention against RequestService directly")
+    accept.add_argument("--sizes", type=int, nargs="+", default=[2, 4, 8, 16, 32, 64])
+    accept.add_argument("--rounds", type=int, default=20)
+    accept.add_argument("--output", help="write results as JSON to this file")
+
+    load = commands.add_parser("load", help="mixed HTTP load against the app in process or a live server")
+    load.add_argument("--base-url", help="live server to target, e.g. http://127.0.0.1:8000; default runs in process")
+    load.add_argument("--duration", type=float, default=10.0, help="seconds of measured load")
+    load.add_argument("--clients", type=int, default=50, help="map clients polling /api/requests")
+    load.add_argument("--poll-interval", type=float, default=1.0, help="seconds between polls per client")
+    load.add_argument("--racers", type=int, default=8, help="helpers racing to accept the same request")
+    load.add_argument("--logins", type=int, default=8, help="logins per burst")
+    load.add_argument("--login-interval", type=float, default=2.0, help="seconds between login bursts")
+    load.add_argument("--admins", type=int, default=1, help="admin clients polling complaints")
+    load.add_argument("--requests", type=int, default=1000, help="requests to seed through the admin import")
+    load.add_argument("--admin-email", default="sviat_admin@gmail.com")
+    load.add_argument("--admin-password", default="1234567890")
+    load.add_argument("--timeout", type=float, default=30.0)
+    load.add_argument("--seed", type=int, default=1)
+    load.add_argument("--output", help="write results as JSON to this file")
+
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in commands.choices and argv[0] not in ("-h", "--help"):
+        argv.insert(0, "accept")
+    args = parser.parse_args(argv)
+    if args.command == "load":
+        return 0 if asyncio.run(run_load(args)) else 1
+    return 0 if asyncio.run(run_accept_contention(args.sizes, args.rounds, args.output)) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
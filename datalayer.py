@@ -1,21 +1,180 @@
+import asyncio
+import multiprocessing
+import os
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional
-from passlib.context import CryptContext
+from typing import Dict, Iterable, List, Optional, Union
 
+from metrics import metrics
+from passwords import hash_password, verify_password
 
-DB_PATH = Path(__file__).with_name("users.db")
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+DB_PATH = Path(os.getenv("UNIFIED_DB_PATH") or Path(__file__).with_name("users.db"))
+CONTACT_CACHE_SIZE = 1024
+SQLITE_CACHE_KIB = 8192
+SQLITE_BUSY_TIMEOUT_MS = 5000
+SQLITE_STATEMENT_CACHE = 256
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "2"))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "32"))
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA cache_size=-{SQLITE_CACHE_KIB}",
+    f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+_contact_cache: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+_contact_cache_lock = threading.Lock()
+
+MIGRATIONS: List[List[str]] = [
+    [
+        "ALTER TABLE users ADD COLUMN email_normalized TEXT",
+        "UPDATE users SET email_normalized = lower(trim(email))",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email_normalized ON users (email_normalized)",
+    ],
+]
+
+class HashingOverloaded(RuntimeError):
+    pass
+
+
+class PasswordHasher:
+    """Runs Argon2 on a small process pool and rejects work beyond a fixed queue depth."""
+
+    def __init__(self, workers: int = HASH_WORKERS, queue_limit: int = HASH_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.in_flight = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self.in_flight >= self.queue_limit:
+            raise HashingOverloaded("Password hashing queue is full")
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def tune_connection(conn) -> None:
+    cursor = conn.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection that records how long each statement takes to execute."""
+
+    metrics_db = "sqlite"
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.observe_query(self.metrics_db, sql, time.perf_counter() - started)
+
+
+class ConnectionPool:
+    """Hands out one tuned, long-lived connection per thread for a SQLite file."""
+
+    def __init__(self, path: Union[str, Path], name: str = "users"):
+        self.path = path
+        self.name = name
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+                cached_statements=SQLITE_STATEMENT_CACHE,
+                factory=TimedConnection,
+            )
+            conn.metrics_db = self.name
+            conn.row_factory = sqlite3.Row
+            tune_connection(conn)
+            self._local.conn = conn
+        return conn
+
+
+class ChangeWatcher:
+    """Tells its owner whether any connection, in any process, has committed to a SQLite file since the last check."""
+
+    def __init__(self, path: Union[str, Path]):
+        self._conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._seen = self._data_version()
+
+    def _data_version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def changed(self) -> bool:
+        with self._lock:
+            current = self._data_version()
+            if current == self._seen:
+                return False
+            self._seen = current
+            return True
+
+
+@contextmanager
+def schema_lock(path: Union[str, Path]):
+    """Serialises schema setup between worker processes sharing a SQLite file."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+_pool = ConnectionPool(DB_PATH)
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 
 def _get_connection() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return _pool.get()
 
 
 def _init_db() -> None:
-    with _get_connection() as conn:
+    with schema_lock(DB_PATH), _get_connection() as conn:
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS users (
@@ -32,8 +191,22 @@ def _init_db() -> None:
             """
         )
         conn.commit()
+        _migrate(conn)
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= number:
+            conn.rollback()
+            continue
+        for statement in statements:
+            conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {number}")
+        conn.commit()
 
-def save_user(
+def insert_user(
     surname: str,
     name: str,
     patronymic: str,
@@ -41,48 +214,75 @@ def save_user(
     phone_code: str,
     phone: str,
     email: str,
-    password: str,
+    password_hash: str,
 ) -> None:
-
-    hashed_password = pwd_context.hash(password)
-
     with _get_connection() as conn:
         conn.execute(
             """
             INSERT INTO users (
-                surname, name, patronymic, gender, phone_code, phone, email, password
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                surname, name, patronymic, gender, phone_code, phone, email, email_normalized, password
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (surname, name, patronymic, gender, phone_code, phone, email, hashed_password),
+            (
+                surname, name, patronymic, gender, phone_code, phone,
+                email, email.strip().lower(), password_hash,
+            ),
         )
         conn.commit()
 
 
-def get_users() -> List[Dict[str, str]]:
+def get_users_by_emails(emails: Iterable[str]) -> Dict[str, Dict[str, str]]:
+    targets = {email.strip().lower() for email in emails if email}
+    found: Dict[str, Dict[str, str]] = {}
+
+    with _contact_cache_lock:
+        if _contact_changes.changed():
+            _contact_cache.clear()
+        for target in targets:
+            contact = _contact_cache.get(target)
+            if contact is not None:
+                _contact_cache.move_to_end(target)
+                found[target] = contact
+
+    missing = sorted(targets - found.keys())
+    if not missing:
+        return found
+
+    placeholders = ", ".join("?" for _ in missing)
     with _get_connection() as conn:
         rows = conn.execute(
-            """
-            SELECT surname, name, patronymic, gender, phone_code, phone, email, password
+            f"""
+            SELECT surname, name, phone_code, phone, email, email_normalized
             FROM users
-            ORDER BY id DESC
-            """
+            WHERE email_normalized IN ({placeholders})
+            """,
+            missing,
         ).fetchall()
 
-    return [dict(row) for row in rows]
+    with _contact_cache_lock:
+        for row in rows:
+            contact = dict(row)
+            target = contact.pop("email_normalized")
+            found[target] = contact
+            _contact_cache[target] = contact
+        while len(_contact_cache) > CONTACT_CACHE_SIZE:
+            _contact_cache.popitem(last=False)
+
+    return found
 
 
 def email_exists(email: str) -> bool:
     target = email.strip().lower()
     with _get_connection() as conn:
         row = conn.execute(
-            "SELECT 1 FROM users WHERE lower(email) = ? LIMIT 1",
+            "SELECT 1 FROM users WHERE email_normalized = ? LIMIT 1",
             (target,),
         ).fetchone()
 
     return row is not None
 
 
-def find_user_by_credentials(email: str, password: str) -> Optional[Dict[str, str]]:
+def get_user_with_password(email: str) -> Optional[Dict[str, str]]:
     target = email.strip().lower()
 
     with _get_connection() as conn:
@@ -90,20 +290,15 @@ def find_user_by_credentials(email: str, password: str) -> Optional[Dict[str, st
             """
             SELECT surname, name, patronymic, gender, phone_code, phone, email, password
             FROM users
-            WHERE lower(email) = ?
+            WHERE email_normalized = ?
             LIMIT 1
             """,
             (target,),
         ).fetchone()
 
-    if row is None:
-        return None
-
+    return dict(row) if row is not None else None
 
-    if not pwd_context.verify(password, row["password"]):
-        return None
 
-    return dict(row)
 def get_user_by_email(email: str) -> Optional[Dict[str, str]]:
     target = email.strip().lower()
     with _get_connection() as conn:
@@ -111,7 +306,7 @@ def get_user_by_email(email: str) -> Optional[Dict[str, str]]:
             """
             SELECT surname, name, patronymic, gender, phone_code, phone, email
             FROM users
-            WHERE lower(email) = ?
+            WHERE email_normalized = ?
             LIMIT 1
             """,
             (target,),
@@ -123,10 +318,17 @@ def delete_user_by_email(email: str) -> bool:
     target = email.strip().lower()
     with _get_connection() as conn:
         cur = conn.execute(
-            "DELETE FROM users WHERE lower(email) = ?",
+            "DELETE FROM users WHERE email_normalized = ?",
             (target,),
         )
         conn.commit()
+    evict_contact(target)
     return cur.rowcount > 0
 
-_init_db()
\ No newline at end of file
+
+def evict_contact(email: str) -> None:
+    with _contact_cache_lock:
+        _contact_cache.pop(email.strip().lower(), None)
+
+_init_db()
+_contact_changes = ChangeWatcher(DB_PATH)
\ No newline at end of file
@@ -1,31 +1,71 @@
 from fastapi import FastAPI, Request, Depends, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from starlette.middleware.sessions import SessionMiddleware
-from sqlalchemy import create_engine, Column, Integer, String, Float
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, delete, event, insert, update, case, literal, or_, Column, Integer, String, Float, MetaData, Table, func, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from contextlib import asynccontextmanager, contextmanager
 from typing import Optional
 import re
+import asyncio
+import math
+import json
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
 from passlib.context import CryptContext
 import os
+import secrets
+from pathlib import Path
+from metrics import MetricsMiddleware, metrics
+from sessions import ServerSessionMiddleware, make_session_store
+from static_assets import ASSETS_DIR, AssetFiles, AssetManifest
 from datalayer import (
+    DB_PATH as USERS_DB_PATH,
+    ChangeWatcher,
+    ConnectionPool,
+    HashingOverloaded,
+    PasswordHasher,
     delete_user_by_email,
     email_exists,
-    find_user_by_credentials,
+    evict_contact,
     get_user_by_email,
-    get_users,
-    save_user,
+    get_user_with_password,
+    get_users_by_emails,
+    insert_user,
+    schema_lock,
+    tune_connection,
 )
-import sqlite3
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
 
-DATABASE_URL = "sqlite:///./requests.db"
+UNIFIED_DB_PATH = os.getenv("UNIFIED_DB_PATH")
+DATABASE_URL = f"sqlite:///{UNIFIED_DB_PATH}" if UNIFIED_DB_PATH else "sqlite:///./requests.db"
 
 Base = declarative_base()
 
 
-COMPLAINTS_DB_PATH = "complaints.db"
+COMPLAINTS_DB_PATH = UNIFIED_DB_PATH or "complaints.db"
+SECRET_KEY_PATH = Path(os.getenv("SECRET_KEY_PATH") or Path(__file__).with_name(".session_secret"))
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH") or "sessions.db"
 ADMIN_EMAILS = {
     "sviat_admin@gmail.com",
     "nadia_admin@gmail.com",
@@ -40,6 +80,46 @@ USER_DELETE_REASONS = {
     "Образлива або агресивна поведінка",
     "Скарги інших користувачів",
 }
+OVERLOADED_MESSAGE = "Сервер перевантажений, спробуйте ще раз за кілька секунд."
+REQUESTS_LIMIT_MAX = 2000
+IMPORT_BATCH_SIZE = 500
+IMPORT_MAX_REPORTED_ERRORS = 1000
+EXPORT_BATCH_SIZE = 1000
+COMPLAINTS_PAGE_SIZE = 50
+COMPLAINTS_PAGE_MAX = 500
+REQUEST_CHANGES_RETAINED = 5000
+EVENTS_QUEUE_SIZE = 100
+EVENTS_SUBSCRIBERS_MAX = int(os.getenv("EVENTS_SUBSCRIBERS_MAX", "1000"))
+SNAPSHOT_CACHE_SIZE = 128
+PAGE_CACHE_SIZE = 256
+SESSION_CACHE_TTL_SECONDS = 30
+SESSION_CACHE_SIZE = 10000
+CLUSTER_MAX_ZOOM = 11
+CLUSTER_LEVEL_OFFSET = 2
+CLUSTER_LEVELS = range(CLUSTER_LEVEL_OFFSET, CLUSTER_MAX_ZOOM + CLUSTER_LEVEL_OFFSET + 1)
+EVENTS_HEARTBEAT_SECONDS = 15
+CHANGE_POLL_SECONDS = 1.0
+CHANGE_POLL_BACKOFF_MAX_SECONDS = 30.0
+SEARCH_PAGE_SIZE = 20
+SEARCH_PAGE_MAX = 100
+SEARCH_TERMS_MAX = 8
+NEARBY_DEFAULT_K = 20
+NEARBY_K_MAX = 100
+NEARBY_START_KM = 2.0
+NEARBY_RADIUS_MAX_KM = 200.0
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = 111.32
+REQUEST_FIELDS = (
+    "id", "title", "description", "lat", "lng", "status", "accepted_by", "author_email", "created_at", "updated_at"
+)
+WIRE_LAYOUTS = {"rows", "columns"}
+WIRE_MEDIA_TYPES = {"json": "application/json", "msgpack": "application/x-msgpack"}
+ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", "20"))
+REQUEST_TTL_DAYS = float(os.getenv("REQUEST_TTL_DAYS", "30"))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "300"))
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_PAGE_SIZE = 50
+ARCHIVE_PAGE_MAX = 500
 
 class RequestDB(Base):
     __tablename__ = "requests"
@@ -49,19 +129,249 @@ class RequestDB(Base):
     description = Column(String, nullable=False)
     lat = Column(Float, nullable=False)
     lng = Column(Float, nullable=False)
-    author_email = Column(String, nullable=False)
-    accepted_by = Column(String, nullable=True)
-    status = Column(String, default="New")
+    author_email = Column(String, nullable=False, index=True)
+    accepted_by = Column(String, nullable=True, index=True)
+    status = Column(String, default="New", index=True)
+    created_at = Column(Float, default=time.time)
+    updated_at = Column(Float, default=time.time, onupdate=time.time, index=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "title": self.title,
+            "description": self.description,
+            "lat": self.lat,
+            "lng": self.lng,
+            "status": self.status,
+            "accepted_by": self.accepted_by,
+            "author_email": self.author_email,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+class ArchivedRequestDB(Base):
+    __tablename__ = "requests_archive"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    request_id = Column(Integer, nullable=False)
+    title = Column(String, nullable=False)
+    description = Column(String, nullable=False)
+    lat = Column(Float, nullable=False)
+    lng = Column(Float, nullable=False)
+    author_email = Column(String, nullable=False, index=True)
+    accepted_by = Column(String, nullable=True, index=True)
+    status = Column(String)
+    created_at = Column(Float)
+    updated_at = Column(Float)
+    archived_at = Column(Float, nullable=False)
+    archive_reason = Column(String, nullable=False)
+
+    def to_dict(self):
+        return {
+            "id": self.request_id,
+            "title": self.title,
+            "description": self.description,
+            "lat": self.lat,
+            "lng": self.lng,
+            "status": self.status,
+            "accepted_by": self.accepted_by,
+            "author_email": self.author_email,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "archived_at": self.archived_at,
+            "archive_reason": self.archive_reason,
+        }
 
 class DeletedRequestNoticeDB(Base):
     __tablename__ = "deleted_request_notices"
 
     id = Column(Integer, primary_key=True, index=True)
-    recipient_email = Column(String, nullable=False)
+    recipient_email = Column(String, nullable=False, index=True)
     request_title = Column(String, nullable=False)
     reason = Column(String, nullable=False)
     deleted_by = Column(String, nullable=False)
 
+class RequestChangeDB(Base):
+    __tablename__ = "request_changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    version = Column(Integer, primary_key=True)
+    request_id = Column(Integer, nullable=False, index=True)
+
+
+spatial_metadata = MetaData()
+
+requests_rtree = Table(
+    "requests_rtree",
+    spatial_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("min_lat", Float),
+    Column("max_lat", Float),
+    Column("min_lng", Float),
+    Column("max_lng", Float),
+)
+
+REQUESTS_RTREE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS requests_rtree
+    USING rtree(id, min_lat, max_lat, min_lng, max_lng)
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS requests_rtree_insert AFTER INSERT ON requests
+    BEGIN
+        INSERT INTO requests_rtree (id, min_lat, max_lat, min_lng, max_lng)
+        VALUES (new.id, new.lat, new.lat, new.lng, new.lng);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS requests_rtree_update AFTER UPDATE OF lat, lng ON requests
+    BEGIN
+        UPDATE requests_rtree
+        SET min_lat = new.lat, max_lat = new.lat, min_lng = new.lng, max_lng = new.lng
+        WHERE id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS requests_rtree_delete AFTER DELETE ON requests
+    BEGIN
+        DELETE FROM requests_rtree WHERE id = old.id;
+    END
+    """,
+    """
+    INSERT INTO requests_rtree (id, min_lat, max_lat, min_lng, max_lng)
+    SELECT id, lat, lat, lng, lng FROM requests
+    WHERE id NOT IN (SELECT id FROM requests_rtree)
+    """,
+]
+
+requests_fts = Table(
+    "requests_fts",
+    spatial_metadata,
+    Column("rowid", Integer, primary_key=True),
+    Column("requests_fts", String),
+    Column("rank", Float),
+)
+
+REQUESTS_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS requests_fts
+    USING fts5(title, description, content='requests', content_rowid='id', tokenize='unicode61 remove_diacritics 2')
+    """,
+    "INSERT INTO requests_fts (requests_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    """
+    CREATE TRIGGER IF NOT EXISTS requests_fts_insert AFTER INSERT ON requests
+    BEGIN
+        INSERT INTO requests_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS requests_fts_update AFTER UPDATE OF title, description ON requests
+    BEGIN
+        INSERT INTO requests_fts (requests_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO requests_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS requests_fts_delete AFTER DELETE ON requests
+    BEGIN
+        INSERT INTO requests_fts (requests_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+]
+
+request_clusters = Table(
+    "request_clusters",
+    spatial_metadata,
+    Column("level", Integer, primary_key=True),
+    Column("cell_x", Integer, primary_key=True),
+    Column("cell_y", Integer, primary_key=True),
+    Column("status", String, primary_key=True),
+    Column("count", Integer),
+    Column("sum_lat", Float),
+    Column("sum_lng", Float),
+)
+
+CLUSTER_CELL_SQL = (
+    "CAST(({row}.lng + 180.0) * (1 << level) / 360.0 AS INTEGER), "
+    "CAST(({row}.lat + 90.0) * (1 << level) / 180.0 AS INTEGER), "
+    "COALESCE({row}.status, 'New')"
+)
+
+CLUSTER_ADD_SQL = f"""
+        INSERT INTO request_clusters (level, cell_x, cell_y, status, count, sum_lat, sum_lng)
+        SELECT level, {CLUSTER_CELL_SQL.format(row="new")}, 1, new.lat, new.lng
+        FROM cluster_levels WHERE true
+        ON CONFLICT (level, cell_x, cell_y, status) DO UPDATE SET
+            count = count + 1,
+            sum_lat = sum_lat + excluded.sum_lat,
+            sum_lng = sum_lng + excluded.sum_lng;
+"""
+
+CLUSTER_REMOVE_SQL = f"""
+        UPDATE request_clusters
+        SET count = count - 1, sum_lat = sum_lat - old.lat, sum_lng = sum_lng - old.lng
+        WHERE (level, cell_x, cell_y, status) IN (
+            SELECT level, {CLUSTER_CELL_SQL.format(row="old")} FROM cluster_levels
+        );
+        DELETE FROM request_clusters
+        WHERE count <= 0 AND (level, cell_x, cell_y, status) IN (
+            SELECT level, {CLUSTER_CELL_SQL.format(row="old")} FROM cluster_levels
+        );
+"""
+
+REQUEST_CLUSTERS_DDL = [
+    "CREATE TABLE IF NOT EXISTS cluster_levels (level INTEGER PRIMARY KEY)",
+    """
+    CREATE TABLE IF NOT EXISTS request_clusters (
+        level INTEGER NOT NULL,
+        cell_x INTEGER NOT NULL,
+        cell_y INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        sum_lat REAL NOT NULL,
+        sum_lng REAL NOT NULL,
+        PRIMARY KEY (level, cell_x, cell_y, status)
+    ) WITHOUT ROWID
+    """,
+    f"CREATE TRIGGER IF NOT EXISTS request_clusters_insert AFTER INSERT ON requests BEGIN {CLUSTER_ADD_SQL} END",
+    f"CREATE TRIGGER IF NOT EXISTS request_clusters_delete AFTER DELETE ON requests BEGIN {CLUSTER_REMOVE_SQL} END",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS request_clusters_update AFTER UPDATE OF lat, lng, status ON requests
+    BEGIN {CLUSTER_REMOVE_SQL} {CLUSTER_ADD_SQL} END
+    """,
+]
+
+CLUSTER_REBUILD_SQL = f"""
+    INSERT INTO request_clusters (level, cell_x, cell_y, status, count, sum_lat, sum_lng)
+    SELECT level, {CLUSTER_CELL_SQL.format(row="requests")} AS cell, count(*), sum(lat), sum(lng)
+    FROM requests, cluster_levels
+    GROUP BY 1, 2, 3, 4
+"""
+
+REQUEST_CHANGES_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS request_changes_insert AFTER INSERT ON requests
+    BEGIN
+        INSERT INTO request_changes (request_id) VALUES (new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS request_changes_update AFTER UPDATE ON requests
+    BEGIN
+        INSERT INTO request_changes (request_id) VALUES (new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS request_changes_delete AFTER DELETE ON requests
+    BEGIN
+        INSERT INTO request_changes (request_id) VALUES (old.id);
+    END
+    """,
+]
+
 
 class Database:
     def __init__(self, url: str):
@@ -69,17 +379,230 @@ class Database:
             url,
             connect_args={"check_same_thread": False}
         )
+        event.listen(self.engine, "connect", lambda dbapi_conn, _record: tune_connection(dbapi_conn))
         self.SessionLocal = sessionmaker(bind=self.engine)
-        Base.metadata.create_all(bind=self.engine)
+        self.async_engine = create_async_engine(
+            make_url(url).set(drivername="sqlite+aiosqlite"),
+            pool_size=ASYNC_DB_POOL_SIZE,
+        )
+        event.listen(
+            self.async_engine.sync_engine, "connect", lambda dbapi_conn, _record: tune_connection(dbapi_conn)
+        )
+        for engine in (self.engine, self.async_engine.sync_engine):
+            event.listen(engine, "before_cursor_execute", self._query_started)
+            event.listen(engine, "after_cursor_execute", self._query_finished)
+        self.AsyncSessionLocal = async_sessionmaker(self.async_engine, expire_on_commit=False)
+        self.path = make_url(url).database
+        with schema_lock(self.path):
+            Base.metadata.create_all(bind=self.engine)
+            self._add_missing_columns()
+            self._create_missing_indexes()
+            self._init_derived_tables()
+        self.changes = ChangeWatcher(self.path)
+
+    @staticmethod
+    def _query_started(conn, _cursor, _statement, _parameters, _context, _executemany):
+        conn.info["query_started"] = time.perf_counter()
+
+    @staticmethod
+    def _query_finished(conn, _cursor, statement, _parameters, _context, _executemany):
+        metrics.observe_query("requests", statement, time.perf_counter() - conn.info["query_started"])
+
+    def _add_missing_columns(self):
+        # create_all() leaves existing tables alone, so columns added to a model later are appended here.
+        with self.engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                existing = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+                for column in table.columns:
+                    if column.name not in existing:
+                        column_type = column.type.compile(dialect=self.engine.dialect)
+                        conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+            now = time.time()
+            conn.execute(
+                update(RequestDB)
+                .where(RequestDB.created_at.is_(None))
+                .values(created_at=now, updated_at=func.coalesce(RequestDB.updated_at, now))
+            )
+
+    def _create_missing_indexes(self):
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=self.engine, checkfirst=True)
+
+    def _init_derived_tables(self):
+        with self.engine.begin() as conn:
+            fts_built = conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'requests_fts'").first()
+            for statement in REQUESTS_RTREE_DDL + REQUESTS_FTS_DDL + REQUEST_CHANGES_DDL + REQUEST_CLUSTERS_DDL:
+                conn.exec_driver_sql(statement)
+            if fts_built is None:
+                conn.exec_driver_sql("INSERT INTO requests_fts (requests_fts) VALUES ('rebuild')")
+            levels = {row[0] for row in conn.exec_driver_sql("SELECT level FROM cluster_levels")}
+            if levels != set(CLUSTER_LEVELS):
+                conn.exec_driver_sql("DELETE FROM cluster_levels")
+                conn.exec_driver_sql("DELETE FROM request_clusters")
+                conn.exec_driver_sql(
+                    "INSERT INTO cluster_levels (level) VALUES " + ", ".join(f"({level})" for level in CLUSTER_LEVELS)
+                )
+                conn.exec_driver_sql(CLUSTER_REBUILD_SQL)
 
     def get_session(self):
         return self.SessionLocal()
 
+    def get_async_session(self):
+        return self.AsyncSessionLocal()
+
+EMAIL_PATTERN = r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$"
+
+
+def is_valid_email(email: str) -> bool:
+    return bool(re.match(EMAIL_PATTERN, email.strip()))
+
+
+class EventBroker:
+
+    def __init__(self, queue_size: int = EVENTS_QUEUE_SIZE, max_subscribers: int = EVENTS_SUBSCRIBERS_MAX):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers: dict[asyncio.Queue, bool] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    def subscribe(self, is_admin: bool = False) -> Optional[asyncio.Queue]:
+        if self.full():
+            return None
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[queue] = is_admin
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.pop(queue, None)
+
+    def publish(self, event: str, data: dict, admin_only: bool = False):
+        loop = self._loop
+        if loop is None or loop.is_closed() or not self._subscribers:
+            return
+        message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        loop.call_soon_threadsafe(self._deliver, message, admin_only)
+
+    def _deliver(self, message: str, admin_only: bool):
+        for queue, is_admin in list(self._subscribers.items()):
+            if admin_only and not is_admin:
+                continue
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                pass
+
+class EventStreamResponse(StreamingResponse):
+    """Server-Sent Events response that runs on_close however the response ends.
+
+    A background task would be skipped when the client drops the connection, and a generator's
+    finally never runs if the client leaves before the first chunk.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, content, on_close, headers: Optional[dict] = None):
+        super().__init__(content, headers=headers)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+class SnapshotCache:
+
+    def __init__(self, maxsize: int = SNAPSHOT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body: bytes):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+class PageCache:
+
+    def __init__(self, templates: Jinja2Templates, maxsize: int = PAGE_CACHE_SIZE):
+        self.templates = templates
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._filenames: dict[str, str] = {}
+
+    def _template_mtime(self, name: str) -> int:
+        filename = self._filenames.get(name)
+        if filename is None:
+            filename = self._filenames[name] = self.templates.get_template(name).filename
+        return os.stat(filename).st_mtime_ns
+
+    def render(self, name: str, context: dict) -> tuple[bytes, str, str]:
+        key = (name, tuple(sorted(context.items())))
+        mtime = self._template_mtime(name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == mtime:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1:]
+            self.misses += 1
+
+        body = self.templates.get_template(name).render(context).encode("utf-8")
+        etag = f'"{zlib.crc32(body):08x}-{len(body)}"'
+        last_modified = formatdate(mtime / 1e9, usegmt=True)
+        with self._lock:
+            self._entries[key] = (mtime, body, etag, last_modified)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return body, etag, last_modified
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
 class UserService:
 
+    def __init__(self, hasher: Optional[PasswordHasher] = None):
+        self.hasher = hasher or PasswordHasher()
+        self._active_users: dict[str, float] = {}
+        self._active_users_lock = threading.Lock()
+        self._user_changes = ChangeWatcher(USERS_DB_PATH)
+
     def _is_valid_email(self, email: str) -> bool:
-        pattern = r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$"
-        return bool(re.match(pattern, email.strip()))
+        return is_valid_email(email)
 
     def validate_register_data(
         self,
@@ -130,31 +653,290 @@ class UserService:
             errors.append("Введіть пароль.")
         return errors
 
-    def login(self, email: str, password: str):
-        return find_user_by_credentials(email=email, password=password)
+    async def login(self, email: str, password: str):
+        user = await run_in_threadpool(get_user_with_password, email)
+        if user is None:
+            return None
+        if not await self.hasher.verify(password, user["password"]):
+            return None
+        return user
 
-    def register(self, **data):
-        save_user(**data)
+    async def register(self, password: str, **data):
+        password_hash = await self.hasher.hash(password)
+        await run_in_threadpool(insert_user, password_hash=password_hash, **data)
 
     def get_by_email(self, email: str):
         return get_user_by_email(email)
 
+    def is_active(self, email: str) -> bool:
+        key = email.strip().lower()
+        now = time.monotonic()
+        if self._user_changes.changed():
+            with self._active_users_lock:
+                self._active_users.clear()
+        expires_at = self._active_users.get(key)
+        if expires_at is not None and expires_at > now:
+            return True
+        if self.get_by_email(key) is None:
+            self.forget(key)
+            return False
+        with self._active_users_lock:
+            if len(self._active_users) >= SESSION_CACHE_SIZE:
+                self._active_users = {k: v for k, v in self._active_users.items() if v > now}
+            self._active_users[key] = now + SESSION_CACHE_TTL_SECONDS
+        return True
+
+    def forget(self, email: str):
+        with self._active_users_lock:
+            self._active_users.pop(email.strip().lower(), None)
+
     def delete_by_email(self, email: str) -> bool:
+        self.forget(email)
         return delete_user_by_email(email)
 
 class RequestService:
 
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, events: Optional[EventBroker] = None):
         self.db = db
-
-    def get_all(self):
+        self.events = events
+        self.snapshots = SnapshotCache()
+        self._version_lock = threading.Lock()
         session = self.db.get_session()
-        requests = session.query(RequestDB).all()
+        self.version = self._current_version(session)
         session.close()
-        return requests
 
-    def create(self, title, description, lat, lng, author_email):
+    def _current_version(self, session) -> int:
+        return session.query(func.max(RequestChangeDB.version)).scalar() or 0
+
+    @staticmethod
+    def _prune_changes(version: int):
+        return delete(RequestChangeDB).where(RequestChangeDB.version <= version - REQUEST_CHANGES_RETAINED)
+
+    def _committed(self, version: int):
+        with self._version_lock:
+            self.version = max(self.version, version)
+        self.snapshots.clear()
+        if self.events is not None:
+            self.events.publish("requests", {"version": self.version})
+
+    def _commit(self, session):
+        version = self._current_version(session)
+        session.execute(self._prune_changes(version))
+        session.commit()
+        self._committed(version)
+
+    async def _commit_async(self, session):
+        version = await session.scalar(select(func.max(RequestChangeDB.version))) or 0
+        await session.execute(self._prune_changes(version))
+        await session.commit()
+        self._committed(version)
+
+    async def current_version(self) -> int:
+        if self.db.changes.changed():
+            async with self.db.get_async_session() as session:
+                version = await session.scalar(select(func.max(RequestChangeDB.version))) or 0
+            if version > self.version:
+                self._committed(version)
+        return self.version
+
+    async def get_snapshot(
+        self,
+        bounds: Optional[tuple] = None,
+        limit: Optional[int] = None,
+        since: Optional[int] = None,
+        fields: tuple = REQUEST_FIELDS,
+        layout: str = "rows",
+        wire: str = "json",
+    ) -> bytes:
+        version = self.version
+        key = (version, bounds, limit, since, fields, layout, wire)
+        body = self.snapshots.get(key)
+        if body is not None:
+            return body
+
+        changes = await self.get_changes_since(since, bounds, fields) if since is not None else None
+        if changes is not None:
+            rows, deleted = changes
+        elif bounds is None:
+            rows, deleted = await self.get_all(fields, limit), []
+        else:
+            rows, deleted = await self.get_in_bounds(*bounds, limit, fields=fields), []
+
+        payload = {"version": version, "full": changes is None, "deleted": deleted}
+        if layout == "columns":
+            payload["columns"] = {field: [row[index] for row in rows] for index, field in enumerate(fields)}
+        else:
+            payload["requests"] = [dict(zip(fields, row)) for row in rows]
+        body = encode_payload(payload, wire)
+        self.snapshots.put(key, body)
+        return body
+
+    @contextmanager
+    def transaction(self):
         session = self.db.get_session()
+        try:
+            yield session
+            self._commit(session)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    @asynccontextmanager
+    async def transaction_async(self):
+        async with self.db.get_async_session() as session:
+            try:
+                yield session
+                await self._commit_async(session)
+            except Exception:
+                await session.rollback()
+                raise
+
+    async def get_changes_since(self, since: int, bounds: Optional[tuple] = None, fields: tuple = REQUEST_FIELDS):
+        async with self.db.get_async_session() as session:
+            oldest = await session.scalar(select(func.min(RequestChangeDB.version)))
+            if since > self.version or oldest is None or since < oldest - 1:
+                return None
+
+            changed_ids = select(RequestChangeDB.request_id).where(RequestChangeDB.version > since)
+            query = select(*self._columns(fields)).where(RequestDB.id.in_(changed_ids))
+            if bounds is not None:
+                query = self._within_bounds(query, *bounds)
+            upserted = (await session.execute(query.order_by(RequestDB.id))).all()
+            deleted = (
+                await session.scalars(
+                    changed_ids.where(~RequestChangeDB.request_id.in_(select(RequestDB.id))).distinct()
+                )
+            ).all()
+        return upserted, list(deleted)
+
+    async def get_clusters(self, zoom: int, south: float, west: float, north: float, east: float):
+        level = min(max(zoom, 0), CLUSTER_MAX_ZOOM) + CLUSTER_LEVEL_OFFSET
+        cells = 1 << level
+        x0, x1 = int((west + 180.0) * cells / 360.0), int((east + 180.0) * cells / 360.0)
+        y0, y1 = int((south + 90.0) * cells / 180.0), int((north + 90.0) * cells / 180.0)
+
+        async with self.db.get_async_session() as session:
+            rows = (
+                await session.execute(
+                    select(request_clusters).where(
+                        request_clusters.c.level == level,
+                        request_clusters.c.cell_x.between(x0, x1),
+                        request_clusters.c.cell_y.between(y0, y1),
+                    )
+                )
+            ).all()
+
+        clusters = {}
+        for row in rows:
+            cluster = clusters.setdefault(
+                (row.cell_x, row.cell_y),
+                {"count": 0, "sum_lat": 0.0, "sum_lng": 0.0, "statuses": {}},
+            )
+            cluster["count"] += row.count
+            cluster["sum_lat"] += row.sum_lat
+            cluster["sum_lng"] += row.sum_lng
+            cluster["statuses"][row.status] = row.count
+
+        return level, [
+            {
+                "cell": f"{level}/{x}/{y}",
+                "lat": cluster["sum_lat"] / cluster["count"],
+                "lng": cluster["sum_lng"] / cluster["count"],
+                "count": cluster["count"],
+                "statuses": cluster["statuses"],
+            }
+            for (x, y), cluster in clusters.items()
+        ]
+
+    @staticmethod
+    def _within_bounds(query, south: float, west: float, north: float, east: float):
+        return query.join(requests_rtree, requests_rtree.c.id == RequestDB.id).filter(
+            requests_rtree.c.max_lat >= south,
+            requests_rtree.c.min_lat <= north,
+            requests_rtree.c.max_lng >= west,
+            requests_rtree.c.min_lng <= east,
+        )
+
+    @staticmethod
+    def _columns(fields: tuple):
+        return [getattr(RequestDB, field) for field in fields]
+
+    async def get_all(self, fields: tuple = REQUEST_FIELDS, limit: Optional[int] = None):
+        query = select(*self._columns(fields))
+        if limit is not None:
+            query = query.order_by(RequestDB.id).limit(limit)
+        async with self.db.get_async_session() as session:
+            return (await session.execute(query)).all()
+
+    async def get_in_bounds(
+        self,
+        south: float,
+        west: float,
+        north: float,
+        east: float,
+        limit: Optional[int] = None,
+        fields: tuple = REQUEST_FIELDS,
+    ):
+        query = self._within_bounds(select(*self._columns(fields)), south, west, north, east).order_by(RequestDB.id)
+        if limit is not None:
+            query = query.limit(limit)
+        async with self.db.get_async_session() as session:
+            return (await session.execute(query)).all()
+
+    @staticmethod
+    def match_expression(text: str) -> Optional[str]:
+        terms = re.findall(r"\w+", text.lower())[:SEARCH_TERMS_MAX]
+        if not terms:
+            return None
+        return " ".join(f'"{term}"*' for term in terms)
+
+    async def search(
+        self,
+        text: str,
+        status: Optional[str] = None,
+        bounds: Optional[tuple] = None,
+        limit: int = SEARCH_PAGE_SIZE,
+        offset: int = 0,
+    ):
+        match = self.match_expression(text)
+        if match is None:
+            return []
+        query = (
+            select(RequestDB)
+            .join(requests_fts, requests_fts.c.rowid == RequestDB.id)
+            .where(requests_fts.c.requests_fts.op("MATCH")(match))
+        )
+        if status is not None:
+            query = query.where(RequestDB.status == status)
+        if bounds is not None:
+            query = self._within_bounds(query, *bounds)
+        query = query.order_by(requests_fts.c.rank, RequestDB.id).limit(limit).offset(offset)
+        async with self.db.get_async_session() as session:
+            return (await session.scalars(query)).all()
+
+    async def nearby(self, lat: float, lng: float, k: int = NEARBY_DEFAULT_K, radius_km: float = NEARBY_RADIUS_MAX_KM):
+        radius = min(NEARBY_START_KM, radius_km)
+        async with self.db.get_async_session() as session:
+            while True:
+                # status || '' keeps SQLite from driving the join off ix_requests_status instead of the R*Tree.
+                query = self._within_bounds(
+                    select(RequestDB).where(RequestDB.status + "" == "New"), *bounding_box(lat, lng, radius)
+                )
+                found = sorted(
+                    (
+                        (distance, req)
+                        for req in (await session.scalars(query)).all()
+                        if (distance := haversine_km(lat, lng, req.lat, req.lng)) <= radius
+                    ),
+                    key=lambda item: (item[0], item[1].id),
+                )
+                if len(found) >= k or radius >= radius_km:
+                    return found[:k]
+                radius = min(radius * 4, radius_km)
+
+    async def create(self, title, description, lat, lng, author_email) -> int:
         new_request = RequestDB(
             title=title,
             description=description,
@@ -163,86 +945,212 @@ class RequestService:
             author_email=author_email,
             status="New"
         )
-        session.add(new_request)
-        session.commit()
-        session.close()
+        async with self.transaction_async() as session:
+            session.add(new_request)
+        return new_request.id
+
+    async def create_many(self, rows: list[dict]) -> int:
+        if not rows:
+            return 0
+        async with self.transaction_async() as session:
+            await session.execute(insert(RequestDB), rows)
+        return len(rows)
+
+    @staticmethod
+    def parse_import_row(line: bytes, default_author: str) -> dict:
+        try:
+            data = json.loads(line)
+        except ValueError:
+            raise ValueError("Invalid JSON")
+        if not isinstance(data, dict):
+            raise ValueError("Row must be a JSON object")
+
+        title = data.get("title")
+        description = data.get("description")
+        if not isinstance(title, str) or not title.strip():
+            raise ValueError("title is required")
+        if not isinstance(description, str) or not description.strip():
+            raise ValueError("description is required")
+
+        try:
+            lat, lng = float(data.get("lat")), float(data.get("lng"))
+        except (TypeError, ValueError):
+            raise ValueError("lat and lng must be numbers")
+        if not -90 <= lat <= 90 or not -180 <= lng <= 180:
+            raise ValueError("lat/lng out of range")
+
+        author_email = data.get("author_email") or default_author
+        if not isinstance(author_email, str) or not is_valid_email(author_email):
+            raise ValueError("author_email is invalid")
 
-    def accept(self, request_id: int, user: str):
-        session = self.db.get_session()
-        req = session.query(RequestDB).filter(RequestDB.id == request_id).first()
+        return {
+            "title": title.strip(),
+            "description": description.strip(),
+            "lat": lat,
+            "lng": lng,
+            "author_email": author_email.strip(),
+            "status": "New",
+        }
 
-        if not req or req.status != "New":
-            session.close()
-            return {"error": "Not available"}
+    async def iter_export(self, status: Optional[str] = None, bounds: Optional[tuple] = None, batch_size: int = EXPORT_BATCH_SIZE):
+        query = select(RequestDB)
+        if status is not None:
+            query = query.where(RequestDB.status == status)
+        if bounds is not None:
+            query = self._within_bounds(query, *bounds)
+        query = query.order_by(RequestDB.id).execution_options(yield_per=batch_size)
+        async with self.db.get_async_session() as session:
+            async for req in await session.stream_scalars(query):
+                yield req.to_dict()
+
+    async def accept(self, request_id: int, user: str):
+        async with self.db.get_async_session() as session:
+            accepted = (
+                await session.execute(
+                    update(RequestDB)
+                    .where(RequestDB.id == request_id, RequestDB.status == "New")
+                    .values(accepted_by=user, status="Accepted")
+                )
+            ).rowcount
 
-        req.accepted_by = user
-        req.status = "Accepted"
-        session.commit()
-        session.close()
+            if not accepted:
+                return {"error": "Not available"}
+
+            await self._commit_async(session)
         return {"success": True}
 
-    def cancel(self, request_id: int, user: str):
-        session = self.db.get_session()
-        req = session.query(RequestDB).filter(RequestDB.id == request_id).first()
+    async def cancel(self, request_id: int, user: str):
+        async with self.db.get_async_session() as session:
+            deleted = (
+                await session.execute(
+                    delete(RequestDB).where(RequestDB.id == request_id, RequestDB.author_email == user)
+                )
+            ).rowcount
+            if deleted:
+                await self._commit_async(session)
+                return {"deleted": True}
+
+            reactivated = (
+                await session.execute(
+                    update(RequestDB)
+                    .where(RequestDB.id == request_id, RequestDB.accepted_by == user, RequestDB.status == "Accepted")
+                    .values(status="New", accepted_by=None)
+                )
+            ).rowcount
+            if reactivated:
+                await self._commit_async(session)
+                return {"reactivated": True}
+
+            exists = await session.scalar(select(RequestDB.id).where(RequestDB.id == request_id))
+        return {"error": "Forbidden"} if exists else {"error": "Not found"}
+
+    async def get_by_id(self, request_id: int):
+        async with self.db.get_async_session() as session:
+            return await session.get(RequestDB, request_id)
+
+    async def complete(self, request_id: int, user: str):
+        async with self.db.get_async_session() as session:
+            completed = (
+                await session.execute(
+                    update(RequestDB)
+                    .where(
+                        RequestDB.id == request_id,
+                        RequestDB.status == "Accepted",
+                        or_(RequestDB.author_email == user, RequestDB.accepted_by == user),
+                    )
+                    .values(status="Done")
+                )
+            ).rowcount
+            if completed:
+                await self._commit_async(session)
+                return {"success": True}
 
+            req = await session.get(RequestDB, request_id)
         if not req:
-            session.close()
             return {"error": "Not found"}
-
-        if user == req.author_email:
-            session.delete(req)
-            session.commit()
-            session.close()
-            return {"deleted": True}
-
-        if user == req.accepted_by:
-            req.status = "New"
-            req.accepted_by = None
-            session.commit()
-            session.close()
-            return {"reactivated": True}
-
-        session.close()
-        return {"error": "Forbidden"}
-    def get_by_id(self, request_id: int):
-        session = self.db.get_session()
-        req = session.query(RequestDB).filter(RequestDB.id == request_id).first()
-        session.close()
-        return req
+        if user != req.author_email and user != req.accepted_by:
+            return {"error": "Forbidden"}
+        return {"error": "Not available"}
+
+    async def archive_batch(self, now: float, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+        expired_before = now - REQUEST_TTL_DAYS * 24 * 60 * 60
+        copied = ("title", "description", "lat", "lng", "author_email", "accepted_by", "status", "created_at", "updated_at")
+        candidates = (
+            select(
+                RequestDB.id,
+                *(getattr(RequestDB, name) for name in copied),
+                literal(now),
+                case((RequestDB.status == "Done", "done"), else_="expired"),
+            )
+            .where(or_(RequestDB.status == "Done", RequestDB.updated_at < expired_before))
+            .order_by(RequestDB.id)
+            .limit(batch_size)
+        )
+        # Copying first takes the write lock, so workers archiving at the same time cannot move the same rows twice.
+        async with self.db.get_async_session() as session:
+            archived = (
+                await session.scalars(
+                    insert(ArchivedRequestDB)
+                    .from_select(["request_id", *copied, "archived_at", "archive_reason"], candidates)
+                    .returning(ArchivedRequestDB.request_id)
+                )
+            ).all()
+            if not archived:
+                return 0
+            await session.execute(delete(RequestDB).where(RequestDB.id.in_(archived)))
+            await self._commit_async(session)
+        return len(archived)
+
+    async def archive(self) -> int:
+        now = time.time()
+        total = 0
+        while True:
+            archived = await self.archive_batch(now)
+            total += archived
+            if archived < ARCHIVE_BATCH_SIZE:
+                return total
+            await asyncio.sleep(0)
+
+    async def get_archive(self, user: str, is_admin: bool, before_id: Optional[int] = None, limit: int = ARCHIVE_PAGE_SIZE):
+        query = select(ArchivedRequestDB).order_by(ArchivedRequestDB.id.desc()).limit(limit)
+        if not is_admin:
+            query = query.where(or_(ArchivedRequestDB.author_email == user, ArchivedRequestDB.accepted_by == user))
+        if before_id is not None:
+            query = query.where(ArchivedRequestDB.id < before_id)
+        async with self.db.get_async_session() as session:
+            return (await session.scalars(query)).all()
 
     def delete_all_by_author(self, author_email: str):
         session = self.db.get_session()
         session.query(RequestDB).filter(RequestDB.author_email == author_email).delete()
-        session.commit()
+        session.query(ArchivedRequestDB).filter(ArchivedRequestDB.author_email == author_email).delete()
+        self._commit(session)
         session.close()
 
     def clear_acceptances_for_user(self, user_email: str):
         session = self.db.get_session()
-        requests = session.query(RequestDB).filter(RequestDB.accepted_by == user_email).all()
-        for req in requests:
-            req.accepted_by = None
-            req.status = "New"
-        session.commit()
+        session.query(RequestDB).filter(RequestDB.accepted_by == user_email, RequestDB.status == "Accepted").update(
+            {RequestDB.accepted_by: None, RequestDB.status: "New"}, synchronize_session=False
+        )
+        session.query(ArchivedRequestDB).filter(ArchivedRequestDB.accepted_by == user_email).update(
+            {ArchivedRequestDB.accepted_by: None}, synchronize_session=False
+        )
+        self._commit(session)
         session.close()
 
-    def get_contacts(self, request_id: int, user: str):
-        session = self.db.get_session()
-        req = session.query(RequestDB).filter(RequestDB.id == request_id).first()
+    async def get_contacts(self, request_id: int, user: str):
+        req = await self.get_by_id(request_id)
 
         if not req or req.status != "Accepted":
-            session.close()
             return {"error": "Not available"}
 
         if user != req.author_email and user != req.accepted_by:
-            session.close()
             return {"error": "Forbidden"}
 
-        users = get_users()
+        users = await run_in_threadpool(get_users_by_emails, [req.author_email, req.accepted_by])
 
-        author = next((u for u in users if u["email"] == req.author_email), None)
-        helper = next((u for u in users if u["email"] == req.accepted_by), None)
-
-        session.close()
+        author = users.get(req.author_email.lower())
+        helper = users.get(req.accepted_by.lower())
 
         return {
             "author": {
@@ -254,60 +1162,76 @@ class RequestService:
                 "phone": helper["phone"] if helper else "Невідомо"
             }
         }
-    def delete_by_admin(self, request_id: int, admin_email: str, reason: str):
-        session = self.db.get_session()
-        req = session.query(RequestDB).filter(RequestDB.id == request_id).first()
 
-        if not req:
-            session.close()
-            return {"error": "Not found"}
+    async def delete_by_admin(self, request_id: int, admin_email: str, reason: str):
+        async with self.db.get_async_session() as session:
+            req = await session.get(RequestDB, request_id)
 
-        notice = DeletedRequestNoticeDB(
-            recipient_email=req.author_email,
-            request_title=req.title,
-            reason=reason,
-            deleted_by=admin_email,
-        )
-        session.add(notice)
-        session.delete(req)
-        session.commit()
-        session.close()
+            if not req:
+                return {"error": "Not found"}
+
+            notice = DeletedRequestNoticeDB(
+                recipient_email=req.author_email,
+                request_title=req.title,
+                reason=reason,
+                deleted_by=admin_email,
+            )
+            session.add(notice)
+            await session.delete(req)
+            await self._commit_async(session)
         return {"deleted": True}
 
-    def pop_deleted_notices(self, user_email: str):
-        session = self.db.get_session()
-        notices = (
-            session.query(DeletedRequestNoticeDB)
-            .filter(DeletedRequestNoticeDB.recipient_email == user_email)
-            .all()
-        )
-        payload = [
-            {
-                "request_title": n.request_title,
-                "reason": n.reason,
-                "deleted_by": n.deleted_by,
-            }
-            for n in notices
-        ]
-        for n in notices:
-            session.delete(n)
-        session.commit()
-        session.close()
+    async def pop_deleted_notices(self, user_email: str):
+        async with self.db.get_async_session() as session:
+            notices = (
+                await session.scalars(
+                    select(DeletedRequestNoticeDB).where(DeletedRequestNoticeDB.recipient_email == user_email)
+                )
+            ).all()
+            payload = [
+                {
+                    "request_title": n.request_title,
+                    "reason": n.reason,
+                    "deleted_by": n.deleted_by,
+                }
+                for n in notices
+            ]
+            for n in notices:
+                await session.delete(n)
+            await session.commit()
         return payload
 
 
 class ComplaintService:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, events: Optional[EventBroker] = None):
         self.db_path = db_path
+        self.events = events
+        self._pool = ConnectionPool(db_path, name="complaints")
         self._init_db()
+        self._changes = ChangeWatcher(db_path)
+        self._signature = self._current_signature()
+
+    def publish(self, action: str, **fields):
+        if self.events is not None:
+            self.events.publish("complaints", {"action": action, **fields}, admin_only=True)
 
     def _connect(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return self._pool.get()
 
-    def _init_db(self):
+    def _current_signature(self):
         with self._connect() as conn:
+            return tuple(conn.execute("SELECT max(id), count(*) FROM complaints").fetchone())
+
+    def poll_changes(self):
+        if not self._changes.changed():
+            return
+        signature = self._current_signature()
+        if signature != self._signature:
+            self._signature = signature
+            self.publish("changed")
+
+    def _init_db(self):
+        with schema_lock(self.db_path), self._connect() as conn:
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS complaints (
@@ -322,11 +1246,17 @@ class ComplaintService:
             columns = [row[1] for row in conn.execute("PRAGMA table_info(complaints)").fetchall()]
             if "request_id" not in columns:
                 conn.execute("ALTER TABLE complaints ADD COLUMN request_id INTEGER")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_complaints_target_email ON complaints (target_email, id)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_complaints_request_id ON complaints (request_id, id)"
+            )
             conn.commit()
 
     def add_complaint(self, sender_email: str, complaint_text: str, target_email: str, request_id: int):
         with self._connect() as conn:
-            conn.execute(
+            cur = conn.execute(
                 """
                 INSERT INTO complaints (sender_email, complaint_text, target_email, request_id)
                 VALUES (?, ?, ?, ?)
@@ -334,18 +1264,68 @@ class ComplaintService:
                 (sender_email, complaint_text, target_email, request_id),
             )
             conn.commit()
+        self.publish("created", id=cur.lastrowid)
+
+    def list_complaints(
+        self,
+        before_id: Optional[int] = None,
+        limit: int = COMPLAINTS_PAGE_SIZE,
+        target_email: Optional[str] = None,
+        request_id: Optional[int] = None,
+    ):
+        conditions, params = [], []
+        if before_id is not None:
+            conditions.append("id < ?")
+            params.append(before_id)
+        if target_email is not None:
+            conditions.append("target_email = ?")
+            params.append(target_email)
+        if request_id is not None:
+            conditions.append("request_id = ?")
+            params.append(request_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
 
-    def list_complaints(self):
         with self._connect() as conn:
             rows = conn.execute(
-                """
+                f"""
                 SELECT id, sender_email, complaint_text, target_email, request_id
                 FROM complaints
+                {where}
                 ORDER BY id DESC
-                """
+                LIMIT ?
+                """,
+                (*params, limit),
             ).fetchall()
         return [dict(row) for row in rows]
 
+    def summarize(self, limit: int = COMPLAINTS_PAGE_SIZE):
+        with self._connect() as conn:
+            by_target = conn.execute(
+                """
+                SELECT target_email, count(*) AS complaints, max(id) AS latest_id
+                FROM complaints
+                GROUP BY target_email
+                ORDER BY complaints DESC, latest_id DESC
+                LIMIT ?
+                """,
+                (limit,),
+            ).fetchall()
+            by_request = conn.execute(
+                """
+                SELECT request_id, target_email, count(*) AS complaints, max(id) AS latest_id
+                FROM complaints
+                WHERE request_id IS NOT NULL
+                GROUP BY request_id
+                ORDER BY complaints DESC, latest_id DESC
+                LIMIT ?
+                """,
+                (limit,),
+            ).fetchall()
+        return {
+            "by_target": [dict(row) for row in by_target],
+            "by_request": [dict(row) for row in by_request],
+        }
+
     def delete_complaint(self, complaint_id: int):
         with self._connect() as conn:
             cur = conn.execute(
@@ -353,40 +1333,247 @@ class ComplaintService:
                 (complaint_id,),
             )
             conn.commit()
+        if cur.rowcount > 0:
+            self.publish("deleted", id=complaint_id)
         return cur.rowcount > 0
 
     def delete_by_request(self, request_id: int):
         with self._connect() as conn:
-            conn.execute(
+            cur = conn.execute(
                 "DELETE FROM complaints WHERE request_id = ?",
                 (request_id,),
             )
             conn.commit()
+        if cur.rowcount > 0:
+            self.publish("deleted", request_id=request_id)
+
+    def delete_by_user(self, email: str):
+        with self._connect() as conn:
+            cur = conn.execute(
+                "DELETE FROM complaints WHERE target_email = ? OR sender_email = ?",
+                (email, email),
+            )
+            conn.commit()
+        if cur.rowcount > 0:
+            self.publish("deleted", email=email)
+
+class ModerationService:
+
+    def __init__(
+        self,
+        user_service: UserService,
+        request_service: RequestService,
+        complaint_service: ComplaintService,
+        unified: bool = False,
+    ):
+        self.user_service = user_service
+        self.request_service = request_service
+        self.complaint_service = complaint_service
+        self.unified = unified
+
+    def delete_user(self, email: str) -> bool:
+        if not self.unified:
+            self.request_service.delete_all_by_author(email)
+            self.request_service.clear_acceptances_for_user(email)
+            self.complaint_service.delete_by_user(email)
+            return self.user_service.delete_by_email(email)
+
+        self.user_service.forget(email)
+        params = {"email": email}
+        try:
+            with self.request_service.transaction() as session:
+                removed = session.execute(
+                    text("DELETE FROM users WHERE email_normalized = lower(:email)"), params
+                ).rowcount
+                if not removed:
+                    raise LookupError(email)
+                session.execute(text("DELETE FROM requests WHERE author_email = :email"), params)
+                session.execute(
+                    text(
+                        "UPDATE requests SET accepted_by = NULL, status = 'New', updated_at = :now "
+                        "WHERE accepted_by = :email AND status = 'Accepted'"
+                    ),
+                    {**params, "now": time.time()},
+                )
+                session.execute(text("DELETE FROM requests_archive WHERE author_email = :email"), params)
+                session.execute(
+                    text("UPDATE requests_archive SET accepted_by = NULL WHERE accepted_by = :email"), params
+                )
+                session.execute(
+                    text("DELETE FROM deleted_request_notices WHERE recipient_email = :email"), params
+                )
+                session.execute(
+                    text("DELETE FROM complaints WHERE target_email = :email OR sender_email = :email"),
+                    params,
+                )
+        except LookupError:
+            return False
+        finally:
+            evict_contact(email)
+
+        self.complaint_service.publish("deleted", email=email)
+        return True
+
+def load_secret_key() -> str:
+    secret = os.getenv("SECRET_KEY")
+    if secret:
+        return secret
+    if not SECRET_KEY_PATH.exists():
+        candidate = SECRET_KEY_PATH.with_name(f"{SECRET_KEY_PATH.name}.{os.getpid()}")
+        candidate.write_text(secrets.token_hex(32))
+        candidate.chmod(0o600)
+        try:
+            os.link(candidate, SECRET_KEY_PATH)
+        except FileExistsError:
+            pass
+        finally:
+            candidate.unlink()
+    return SECRET_KEY_PATH.read_text().strip()
+
+def clamp_bounds(south: float, west: float, north: float, east: float):
+    south, north = max(south, -90.0), min(north, 90.0)
+    if east - west >= 360:
+        west, east = -180.0, 180.0
+    west, east = max(west, -180.0), min(east, 180.0)
+    return south, west, north, east
+
+def encode_payload(payload: dict, wire: str = "json") -> bytes:
+    if wire == "msgpack":
+        return msgpack.packb(payload)
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def splice_payload(envelope: dict, body: bytes, wire: str = "json") -> bytes:
+    head = encode_payload(envelope, wire)
+    if wire == "msgpack":
+        # Both are fixmaps (fewer than 16 keys): merge their entry counts into a single header byte.
+        return bytes([0x80 | ((head[0] & 0x0F) + (body[0] & 0x0F))]) + head[1:] + body[1:]
+    return head[:-1] + b"," + body[1:]
+
+def parse_fields(fields: Optional[str]) -> Optional[tuple]:
+    if not fields:
+        return REQUEST_FIELDS
+    requested = {field.strip() for field in fields.split(",") if field.strip()} | {"id"}
+    if not requested <= set(REQUEST_FIELDS):
+        return None
+    return tuple(field for field in REQUEST_FIELDS if field in requested)
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def bounding_box(lat: float, lng: float, radius_km: float):
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = math.cos(math.radians(lat))
+    dlng = 360.0 if cos_lat < 1e-6 else min(radius_km / (KM_PER_DEGREE_LAT * cos_lat), 360.0)
+    return clamp_bounds(lat - dlat, lng - dlng, lat + dlat, lng + dlng)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return any(tag.strip() in (etag, "*") for tag in header.split(","))
+
+def not_modified_since(request: Request, last_modified: str) -> bool:
+    header = request.headers.get("if-modified-since")
+    if not header or "if-none-match" in request.headers:
+        return False
+    try:
+        return parsedate_to_datetime(header) >= parsedate_to_datetime(last_modified)
+    except (TypeError, ValueError):
+        return False
 
 class AppFactory:
 
     def __init__(self):
         self.db = Database(DATABASE_URL)
-        self.user_service = UserService()
-        self.request_service = RequestService(self.db)
+        self.events = EventBroker()
+        self.user_service = UserService(PasswordHasher())
+        self.request_service = RequestService(self.db, self.events)
 
-        self.app = FastAPI()
+        self.app = FastAPI(lifespan=self._lifespan)
         self.templates = Jinja2Templates(directory=".")
-        self.complaint_service = ComplaintService(COMPLAINTS_DB_PATH)
+        self.page_cache = PageCache(self.templates)
+        self.complaint_service = ComplaintService(COMPLAINTS_DB_PATH, self.events)
+        self.moderation_service = ModerationService(
+            self.user_service,
+            self.request_service,
+            self.complaint_service,
+            unified=UNIFIED_DB_PATH is not None,
+        )
         self._configure()
 
+    @asynccontextmanager
+    async def _lifespan(self, app: FastAPI):
+        watcher = asyncio.create_task(self._watch_changes())
+        archiver = asyncio.create_task(self._archive_requests())
+        yield
+        watcher.cancel()
+        archiver.cancel()
+        self.user_service.hasher.shutdown()
+        await self.db.async_engine.dispose()
+
+    async def _watch_changes(self):
+        delay = CHANGE_POLL_SECONDS
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self.request_service.current_version()
+                await run_in_threadpool(self.complaint_service.poll_changes)
+            except Exception:
+                delay = min(delay * 2, CHANGE_POLL_BACKOFF_MAX_SECONDS)
+                logger.exception("Polling for changes from other workers failed; retrying in %.0f s", delay)
+                continue
+            delay = CHANGE_POLL_SECONDS
+
+    async def _archive_requests(self):
+        while True:
+            try:
+                await self.request_service.archive()
+            except Exception:
+                logger.exception("Archiving finished and stale requests failed")
+            await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
     def _configure(self):
-        secret_key = os.getenv("SECRET_KEY", os.urandom(32))
-        self.app.add_middleware(SessionMiddleware, secret_key=secret_key)
-        self.app.mount("/static", StaticFiles(directory="."), name="static")
+        secret_key = load_secret_key()
+        self.app.add_middleware(
+            ServerSessionMiddleware,
+            secret_key=secret_key,
+            store=make_session_store(SESSION_BACKEND, SESSION_DB_PATH),
+        )
+        self.app.add_middleware(MetricsMiddleware, registry=metrics)
+        manifest = AssetManifest()
+        if manifest.built:
+            self.app.mount("/static", AssetFiles(manifest), name="static")
+        else:
+            self.app.mount("/static", StaticFiles(directory=ASSETS_DIR), name="static")
+        self.templates.env.globals["asset"] = manifest.url
+        self.templates.env.globals["asset_srcset"] = manifest.srcset
         self._register_routes()
 
+    def render_page(self, request: Request, name: str, **context):
+        body, etag, last_modified = self.page_cache.render(name, context)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": last_modified,
+            "Cache-Control": "private, no-cache",
+            "Vary": "Cookie",
+        }
+        if etag_matches(request, etag) or not_modified_since(request, last_modified):
+            return Response(status_code=304, headers=headers)
+        return HTMLResponse(body, headers=headers)
+
     def require_login(self, request: Request):
         user = request.session.get("user")
         if not user:
             next_url = request.url.path
             return RedirectResponse(url=f"/login?next={next_url}", status_code=302)
-        if user.lower() not in ADMIN_EMAILS and self.user_service.get_by_email(user) is None:
+        if user.lower() not in ADMIN_EMAILS and not self.user_service.is_active(user):
             request.session.clear()
             next_url = request.url.path
             return RedirectResponse(url=f"/login?next={next_url}", status_code=302)
@@ -397,6 +1584,8 @@ class AppFactory:
         @self.app.get("/")
         def home(request: Request):
             deleted_notifications = request.session.pop("deleted_notifications", [])
+            if not request.session.get("user") and not deleted_notifications:
+                return self.render_page(request, "index.html", user=None, deleted_notifications=None)
             return self.templates.TemplateResponse("index.html", {
                 "request": request,
                 "user": request.session.get("user"),
@@ -405,17 +1594,19 @@ class AppFactory:
 
         @self.app.get("/register", response_class=HTMLResponse)
         def register_page(request: Request):
-            return self.templates.TemplateResponse("register.html", {"request": request})
+            return self.render_page(request, "register.html")
 
         @self.app.get("/about", response_class=HTMLResponse)
         def about_page(request: Request):
+            if not request.session.get("user"):
+                return self.render_page(request, "about.html", user=None)
             return self.templates.TemplateResponse("about.html", {
                 "request": request,
                 "user": request.session.get("user")
             })
 
         @self.app.post("/register", response_class=HTMLResponse)
-        def register(
+        async def register(
             request: Request,
             surname: str = Form(""),
             name: str = Form(""),
@@ -426,7 +1617,8 @@ class AppFactory:
             email: str = Form(""),
             password: str = Form(""),
         ):
-            errors = self.user_service.validate_register_data(
+            errors = await run_in_threadpool(
+                self.user_service.validate_register_data,
                 surname, name, patronymic,
                 gender, phone_code, phone,
                 email, password
@@ -439,18 +1631,25 @@ class AppFactory:
                     "show_error_modal": True
                 })
 
-            self.user_service.register(
-                surname=surname.strip(),
-                name=name.strip(),
-                patronymic=patronymic.strip(),
-                gender=gender,
-                phone_code=phone_code,
-                phone=phone.strip(),
-                email=email.strip(),
-                password=password.strip(),
-            )
-            user = self.user_service.login(email.strip(), password.strip())
-            request.session["user"] = user["email"]
+            try:
+                await self.user_service.register(
+                    surname=surname.strip(),
+                    name=name.strip(),
+                    patronymic=patronymic.strip(),
+                    gender=gender,
+                    phone_code=phone_code,
+                    phone=phone.strip(),
+                    email=email.strip(),
+                    password=password.strip(),
+                )
+            except HashingOverloaded:
+                return self.templates.TemplateResponse("register.html", {
+                    "request": request,
+                    "errors": [OVERLOADED_MESSAGE],
+                    "show_error_modal": True
+                }, status_code=503)
+
+            request.session["user"] = email.strip()
             return RedirectResponse(url="/", status_code=302)
 
         @self.app.get("/login", response_class=HTMLResponse)
@@ -458,13 +1657,10 @@ class AppFactory:
             if request.session.get("user"):
                 return RedirectResponse("/", status_code=302)
 
-            return self.templates.TemplateResponse("login.html", {
-                "request": request,
-                "next": next
-            })
+            return self.render_page(request, "login.html", next=next)
 
         @self.app.post("/login", response_class=HTMLResponse)
-        def login_submit(
+        async def login_submit(
             request: Request,
             email: str = Form(""),
             password: str = Form(""),
@@ -478,7 +1674,14 @@ class AppFactory:
                     email_normalized in ADMIN_EMAILS and
                     password.strip() == ADMIN_PASSWORD
                 )
-                user = {"email": email_normalized} if is_admin else self.user_service.login(email, password)
+                try:
+                    user = {"email": email_normalized} if is_admin else await self.user_service.login(email, password)
+                except HashingOverloaded:
+                    return self.templates.TemplateResponse("login.html", {
+                        "request": request,
+                        "errors": [OVERLOADED_MESSAGE],
+                        "show_error_modal": True
+                    }, status_code=503)
                 if user is None:
                     errors.append("Невірна пошта або пароль.")
 
@@ -491,7 +1694,7 @@ class AppFactory:
 
             request.session["user"] = user["email"]
             request.session["is_admin"] = user["email"].lower() in ADMIN_EMAILS
-            request.session["deleted_notifications"] = self.request_service.pop_deleted_notices(user["email"])
+            request.session["deleted_notifications"] = await self.request_service.pop_deleted_notices(user["email"])
             redirect_url = next if next else "/"
             return RedirectResponse(url=redirect_url, status_code=302)
 
@@ -512,30 +1715,161 @@ class AppFactory:
             })
 
         @self.app.get("/api/requests")
-        def get_requests(request: Request):
+        async def get_requests(
+            request: Request,
+            south: Optional[float] = None,
+            west: Optional[float] = None,
+            north: Optional[float] = None,
+            east: Optional[float] = None,
+            limit: Optional[int] = None,
+            since: Optional[int] = None,
+            fields: Optional[str] = None,
+            layout: str = "rows",
+            format: str = "json",
+        ):
             current_user = request.session.get("user")
             is_admin = bool(request.session.get("is_admin"))
 
-            requests = self.request_service.get_all()
+            projection = parse_fields(fields)
+            if projection is None:
+                return {"error": f"fields must be a subset of {','.join(REQUEST_FIELDS)}"}
+            if layout not in WIRE_LAYOUTS:
+                return {"error": "layout must be rows or columns"}
+            if format not in WIRE_MEDIA_TYPES:
+                return {"error": "format must be json or msgpack"}
+            if format == "msgpack" and msgpack is None:
+                return {"error": "MessagePack is not available"}
+
+            version = await self.request_service.current_version()
+            if since is not None and since == version:
+                return Response(status_code=304)
+
+            if limit is not None:
+                limit = max(1, min(limit, REQUESTS_LIMIT_MAX))
+
+            bounds = None
+            if None not in (south, west, north, east):
+                bounds = clamp_bounds(south, west, north, east)
+
+            variant = repr((current_user, is_admin, bounds, limit, since, projection, layout, format)).encode("utf-8")
+            etag = f'"{version}-{zlib.crc32(variant):08x}"'
+            if etag_matches(request, etag):
+                return Response(status_code=304, headers={"ETag": etag})
+
+            body = await self.request_service.get_snapshot(bounds, limit, since, projection, layout, format)
+            envelope = {"current_user": current_user, "is_admin": is_admin}
+            return Response(
+                content=splice_payload(envelope, body, format),
+                media_type=WIRE_MEDIA_TYPES[format],
+                headers={"ETag": etag, "Cache-Control": "no-cache"},
+            )
+
+        @self.app.get("/api/requests/clusters")
+        async def get_request_clusters(
+            request: Request,
+            zoom: int,
+            south: float = -90.0,
+            west: float = -180.0,
+            north: float = 90.0,
+            east: float = 180.0,
+            since: Optional[int] = None,
+        ):
+            version = await self.request_service.current_version()
+            if since is not None and since == version:
+                return Response(status_code=304)
 
+            level, clusters = await self.request_service.get_clusters(zoom, *clamp_bounds(south, west, north, east))
             return {
-                "current_user": current_user,
-                "is_admin": is_admin,
-                "requests": [
-                    {
-                        "id": r.id,
-                        "title": r.title,
-                        "description": r.description,
-                        "lat": r.lat,
-                        "lng": r.lng,
-                        "status": r.status,
-                        "accepted_by": r.accepted_by,
-                        "author_email": r.author_email
-                    }
-                    for r in requests
-                ]
+                "current_user": request.session.get("user"),
+                "is_admin": bool(request.session.get("is_admin")),
+                "version": version,
+                "level": level,
+                "clusters": clusters,
             }
 
+        @self.app.get("/api/requests/search")
+        async def search_requests(
+            request: Request,
+            q: str = "",
+            status: Optional[str] = None,
+            south: Optional[float] = None,
+            west: Optional[float] = None,
+            north: Optional[float] = None,
+            east: Optional[float] = None,
+            cursor: int = 0,
+            limit: int = SEARCH_PAGE_SIZE,
+        ):
+            if not q.strip():
+                return {"error": "Query is required"}
+
+            limit = max(1, min(limit, SEARCH_PAGE_MAX))
+            cursor = max(cursor, 0)
+            bounds = None
+            if None not in (south, west, north, east):
+                bounds = clamp_bounds(south, west, north, east)
+
+            requests = await self.request_service.search(q, status, bounds, limit + 1, cursor)
+            return {
+                "current_user": request.session.get("user"),
+                "is_admin": bool(request.session.get("is_admin")),
+                "requests": [r.to_dict() for r in requests[:limit]],
+                "next_cursor": cursor + limit if len(requests) > limit else None,
+            }
+
+        @self.app.get("/api/requests/nearby")
+        async def nearby_requests(
+            request: Request,
+            lat: float,
+            lng: float,
+            k: int = NEARBY_DEFAULT_K,
+            radius_km: float = NEARBY_RADIUS_MAX_KM,
+        ):
+            if not -90 <= lat <= 90 or not -180 <= lng <= 180:
+                return {"error": "lat/lng out of range"}
+
+            k = max(1, min(k, NEARBY_K_MAX))
+            radius_km = max(0.1, min(radius_km, NEARBY_RADIUS_MAX_KM))
+            found = await self.request_service.nearby(lat, lng, k, radius_km)
+            return {
+                "current_user": request.session.get("user"),
+                "is_admin": bool(request.session.get("is_admin")),
+                "requests": [{**req.to_dict(), "distance_km": round(distance, 3)} for distance, req in found],
+            }
+
+        @self.app.get("/api/requests/archive")
+        async def archived_requests(request: Request, cursor: Optional[int] = None, limit: int = ARCHIVE_PAGE_SIZE):
+            user = request.session.get("user")
+            is_admin = bool(request.session.get("is_admin"))
+            if not user:
+                return {"error": "Not authorized"}
+
+            limit = max(1, min(limit, ARCHIVE_PAGE_MAX))
+            archived = await self.request_service.get_archive(user, is_admin, before_id=cursor, limit=limit + 1)
+            next_cursor = archived[limit - 1].id if len(archived) > limit else None
+            return {"requests": [req.to_dict() for req in archived[:limit]], "next_cursor": next_cursor}
+
+        @self.app.get("/api/events")
+        async def stream_events(request: Request):
+            version = await self.request_service.current_version()
+            queue = self.events.subscribe(bool(request.session.get("is_admin")))
+            if queue is None:
+                return Response(status_code=503, headers={"Retry-After": "30"})
+
+            async def stream():
+                yield f"retry: 3000\nevent: hello\ndata: {json.dumps({'version': version})}\n\n"
+                while True:
+                    try:
+                        message = await asyncio.wait_for(queue.get(), EVENTS_HEARTBEAT_SECONDS)
+                    except asyncio.TimeoutError:
+                        message = ": keepalive\n\n"
+                    yield message
+
+            return EventStreamResponse(
+                stream(),
+                on_close=lambda: self.events.unsubscribe(queue),
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+
         @self.app.post("/api/requests")
         async def add_request(
             request: Request,
@@ -548,26 +1882,111 @@ class AppFactory:
             if not user:
                 return {"error": "Not authorized"}
 
-            self.request_service.create(title, description, lat, lng, user)
+            await self.request_service.create(title, description, lat, lng, user)
             return {"success": True}
 
+        @self.app.post("/api/requests/import")
+        async def import_requests(request: Request):
+            user = request.session.get("user")
+            is_admin = bool(request.session.get("is_admin"))
+            if not user:
+                return {"error": "Not authorized"}
+            if not is_admin:
+                return {"error": "Forbidden"}
+
+            inserted, error_count, errors = 0, 0, []
+            batch: list[dict] = []
+            line_number = 0
+            buffer = b""
+
+            async def handle(line: bytes):
+                nonlocal inserted, error_count, batch, line_number
+                line_number += 1
+                if not line.strip():
+                    return
+                try:
+                    batch.append(self.request_service.parse_import_row(line, user))
+                except ValueError as exc:
+                    error_count += 1
+                    if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+                        errors.append({"line": line_number, "error": str(exc)})
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    inserted += await self.request_service.create_many(batch)
+                    batch = []
+
+            async for chunk in request.stream():
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    await handle(line)
+            if buffer:
+                await handle(buffer)
+            inserted += await self.request_service.create_many(batch)
+
+            return {"inserted": inserted, "error_count": error_count, "errors": errors}
+
+        @self.app.get("/api/requests/export")
+        async def export_requests(
+            request: Request,
+            status: Optional[str] = None,
+            south: Optional[float] = None,
+            west: Optional[float] = None,
+            north: Optional[float] = None,
+            east: Optional[float] = None,
+        ):
+            user = request.session.get("user")
+            is_admin = bool(request.session.get("is_admin"))
+            if not user:
+                return {"error": "Not authorized"}
+            if not is_admin:
+                return {"error": "Forbidden"}
+
+            bounds = None
+            if None not in (south, west, north, east):
+                bounds = clamp_bounds(south, west, north, east)
+
+            async def stream():
+                lines = []
+                async for row in self.request_service.iter_export(status, bounds):
+                    lines.append(json.dumps(row, ensure_ascii=False))
+                    if len(lines) >= EXPORT_BATCH_SIZE:
+                        yield "\n".join(lines) + "\n"
+                        lines = []
+                if lines:
+                    yield "\n".join(lines) + "\n"
+
+            return StreamingResponse(
+                stream(),
+                media_type="application/x-ndjson",
+                headers={"Content-Disposition": 'attachment; filename="requests.ndjson"'},
+            )
+
         @self.app.post("/api/requests/{request_id}/accept")
-        def accept_request(request_id: int, request: Request):
+        async def accept_request(request_id: int, request: Request):
             user = request.session.get("user")
             if not user:
                 return {"error": "Not authorized"}
 
-            return self.request_service.accept(request_id, user)
+            return await self.request_service.accept(request_id, user)
 
         @self.app.post("/api/requests/{request_id}/cancel")
-        def cancel_request(request_id: int, request: Request):
+        async def cancel_request(request_id: int, request: Request):
             user = request.session.get("user")
             if not user:
                 return {"error": "Not authorized"}
 
-            return self.request_service.cancel(request_id, user)
+            return await self.request_service.cancel(request_id, user)
+
+        @self.app.post("/api/requests/{request_id}/complete")
+        async def complete_request(request_id: int, request: Request):
+            user = request.session.get("user")
+            if not user:
+                return {"error": "Not authorized"}
+
+            return await self.request_service.complete(request_id, user)
+
         @self.app.post("/api/requests/{request_id}/delete")
-        def delete_request_by_admin(
+        async def delete_request_by_admin(
             request_id: int,
             request: Request,
             reason: str = Form(""),
@@ -580,11 +1999,11 @@ class AppFactory:
                 return {"error": "Forbidden"}
             if not reason.strip():
                 return {"error": "Reason is required"}
-            self.complaint_service.delete_by_request(request_id)
-            return self.request_service.delete_by_admin(request_id, user, reason.strip())
+            await run_in_threadpool(self.complaint_service.delete_by_request, request_id)
+            return await self.request_service.delete_by_admin(request_id, user, reason.strip())
 
         @self.app.post("/api/requests/{request_id}/report")
-        def report_request(
+        async def report_request(
             request_id: int,
             request: Request,
             complaint_text: str = Form(""),
@@ -595,7 +2014,7 @@ class AppFactory:
             if not complaint_text.strip():
                 return {"error": "Complaint text is required"}
 
-            req = self.request_service.get_by_id(request_id)
+            req = await self.request_service.get_by_id(request_id)
             if not req:
                 return {"error": "Not found"}
             if sender_email == req.author_email:
@@ -603,7 +2022,8 @@ class AppFactory:
 
             target_email = req.author_email
 
-            self.complaint_service.add_complaint(
+            await run_in_threadpool(
+                self.complaint_service.add_complaint,
                 sender_email=sender_email,
                 complaint_text=complaint_text.strip(),
                 target_email=target_email,
@@ -612,14 +2032,60 @@ class AppFactory:
             return {"success": True}
 
         @self.app.get("/api/complaints")
-        def list_complaints(request: Request):
+        def list_complaints(
+            request: Request,
+            cursor: Optional[int] = None,
+            limit: int = COMPLAINTS_PAGE_SIZE,
+            target_email: Optional[str] = None,
+            request_id: Optional[int] = None,
+        ):
             user = request.session.get("user")
             is_admin = bool(request.session.get("is_admin"))
             if not user:
                 return {"error": "Not authorized"}
             if not is_admin:
                 return {"error": "Forbidden"}
-            return {"complaints": self.complaint_service.list_complaints()}
+
+            limit = max(1, min(limit, COMPLAINTS_PAGE_MAX))
+            complaints = self.complaint_service.list_complaints(
+                before_id=cursor,
+                limit=limit + 1,
+                target_email=target_email.strip() if target_email else None,
+                request_id=request_id,
+            )
+            next_cursor = complaints[limit - 1]["id"] if len(complaints) > limit else None
+            return {"complaints": complaints[:limit], "next_cursor": next_cursor}
+
+        @self.app.get("/api/complaints/summary")
+        def summarize_complaints(request: Request, limit: int = COMPLAINTS_PAGE_SIZE):
+            user = request.session.get("user")
+            is_admin = bool(request.session.get("is_admin"))
+            if not user:
+                return {"error": "Not authorized"}
+            if not is_admin:
+                return {"error": "Forbidden"}
+            return self.complaint_service.summarize(max(1, min(limit, COMPLAINTS_PAGE_MAX)))
+
+        @self.app.get("/api/admin/cache")
+        def get_cache_stats(request: Request):
+            user = request.session.get("user")
+            is_admin = bool(request.session.get("is_admin"))
+            if not user:
+                return {"error": "Not authorized"}
+            if not is_admin:
+                return {"error": "Forbidden"}
+            return {"requests": self.request_service.snapshots.stats(), "pages": self.page_cache.stats()}
+
+        @self.app.get("/metrics")
+        def get_metrics(request: Request):
+            token = os.getenv("METRICS_TOKEN")
+            authorized = (
+                bool(request.session.get("is_admin"))
+                or bool(token) and request.headers.get("authorization") == f"Bearer {token}"
+            )
+            if not authorized:
+                return Response("Forbidden\n", status_code=403, media_type="text/plain")
+            return Response(metrics.render(), media_type="text/plain; version=0.0.4")
 
         @self.app.get("/api/admin/users/search")
         def search_user_for_admin(request: Request, email: str = ""):
@@ -665,9 +2131,7 @@ class AppFactory:
             if self.user_service.get_by_email(target) is None:
                 return {"error": "Користувача не знайдено"}
 
-            self.request_service.delete_all_by_author(target)
-            self.request_service.clear_acceptances_for_user(target)
-            deleted = self.user_service.delete_by_email(target)
+            deleted = self.moderation_service.delete_user(target)
             if not deleted:
                 return {"error": "Користувача не знайдено"}
 
@@ -692,13 +2156,24 @@ class AppFactory:
 
 
 
+        @self.app.get("/api/requests/{request_id}")
+        async def get_request(request_id: int, request: Request):
+            req = await self.request_service.get_by_id(request_id)
+            if not req:
+                return {"error": "Not found"}
+            return {
+                "current_user": request.session.get("user"),
+                "is_admin": bool(request.session.get("is_admin")),
+                "request": req.to_dict(),
+            }
+
         @self.app.get("/api/requests/{request_id}/contacts")
-        def get_contacts(request_id: int, request: Request):
+        async def get_contacts(request_id: int, request: Request):
             user = request.session.get("user")
             if not user:
                 return {"error": "Not authorized"}
 
-            return self.request_service.get_contacts(request_id, user)
+            return await self.request_service.get_contacts(request_id, user)
 
         @self.app.get("/logout")
         def logout(request: Request):
@@ -0,0 +1,177 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, Tuple
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+STATEMENT_LABEL_LENGTH = 160
+STATEMENT_LABELS_MAX = 500
+
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def statement_label(sql: str) -> str:
+    label = _WHITESPACE.sub(" ", sql).strip()
+    label = _PLACEHOLDER_LIST.sub("(?)", label)
+    return label[:STATEMENT_LABEL_LENGTH]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}"
+
+
+class Histogram:
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+    def render(self, name: str, label_names: Tuple[str, ...], label_values: Tuple[str, ...]) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            le = f'le="{bound}"'
+            lines.append(f"{name}_bucket{_labels(label_names, label_values, le)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(label_names, label_values)} {self.total}")
+        lines.append(f"{name}_count{_labels(label_names, label_values)} {cumulative}")
+        return lines
+
+
+class Metrics:
+    """Process-wide request and query timings rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str], Histogram] = {}
+        self._errors: Dict[Tuple[str, str], int] = {}
+        self._queries: Dict[Tuple[str, str], Histogram] = {}
+
+    def observe_request(self, method: str, route: str, seconds: float, failed: bool):
+        key = (method, route)
+        with self._lock:
+            histogram = self._requests.get(key)
+            if histogram is None:
+                histogram = self._requests[key] = Histogram(HTTP_BUCKETS)
+            histogram.observe(seconds)
+            if failed:
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+    def observe_query(self, db: str, sql: str, seconds: float):
+        key = (db, statement_label(sql))
+        with self._lock:
+            histogram = self._queries.get(key)
+            if histogram is None:
+                if len(self._queries) >= STATEMENT_LABELS_MAX:
+                    key = (db, "other")
+                    histogram = self._queries.get(key)
+                if histogram is None:
+                    histogram = self._queries[key] = Histogram(QUERY_BUCKETS)
+            histogram.observe(seconds)
+
+    def render(self) -> str:
+        route_labels = ("method", "route")
+        query_labels = ("db", "statement")
+        with self._lock:
+            lines = [
+                "# HELP helphub_http_requests_total HTTP requests handled, by route.",
+                "# TYPE helphub_http_requests_total counter",
+            ]
+            for key, histogram in sorted(self._requests.items()):
+                lines.append(f"helphub_http_requests_total{_labels(route_labels, key)} {sum(histogram.counts)}")
+            lines += [
+                "# HELP helphub_http_errors_total HTTP requests that raised or answered with a 5xx status, by route.",
+                "# TYPE helphub_http_errors_total counter",
+            ]
+            for key, errors in sorted(self._errors.items()):
+                lines.append(f"helphub_http_errors_total{_labels(route_labels, key)} {errors}")
+            lines += [
+                "# HELP helphub_http_request_duration_seconds Time to send the full response (event streams: until the response starts), by route.",
+                "# TYPE helphub_http_request_duration_seconds histogram",
+            ]
+            for key, histogram in sorted(self._requests.items()):
+                lines += histogram.render("helphub_http_request_duration_seconds", route_labels, key)
+            lines += [
+                "# HELP helphub_db_query_duration_seconds Statement execution time, by database and statement.",
+                "# TYPE helphub_db_query_duration_seconds histogram",
+            ]
+            for key, histogram in sorted(self._queries.items()):
+                lines += histogram.render("helphub_db_query_duration_seconds", query_labels, key)
+        return "\n".join(lines) + "\n"
+
+
+def _is_event_stream(headers) -> bool:
+    return any(name.lower() == b"content-type" and value.startswith(b"text/event-stream") for name, value in headers)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request against its route template.
+
+    Event streams stay open for the whole client session, so they are timed only up to the
+    response start.
+    """
+
+    def __init__(self, app, registry: Metrics):
+        self.app = app
+        self.registry = registry
+
+    @staticmethod
+    def _route_label(scope, root_path: str) -> str:
+        route = scope.get("route")
+        path = getattr(route, "path_format", None) or getattr(route, "path", None)
+        if path:
+            return path
+        # Mounts such as /static do not set scope["route"]; they extend root_path by their prefix instead.
+        mounted = scope.get("root_path", "")
+        if mounted != root_path and mounted.startswith(root_path):
+            return mounted[len(root_path):]
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        streaming = False
+        root_path = scope.get("root_path", "")
+        started = time.perf_counter()
+
+        def observe():
+            path = self._route_label(scope, root_path)
+            self.registry.observe_request(scope["method"], path, time.perf_counter() - started, status >= 500)
+
+        async def send_with_status(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if _is_event_stream(message.get("headers", ())):
+                    streaming = True
+                    observe()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if not streaming:
+                observe()
+
+
+metrics = Metrics()
@@ -0,0 +1,16 @@
+"""Argon2 helpers run inside PasswordHasher's worker processes.
+
+Spawned workers import this module to unpickle the functions, so it must stay free of
+import-time side effects such as opening databases.
+"""
+from passlib.context import CryptContext
+
+pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
@@ -0,0 +1,222 @@
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Union
+
+from itsdangerous import BadSignature, TimestampSigner
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+
+from datalayer import SQLITE_BUSY_TIMEOUT_MS, ConnectionPool, TimedConnection, schema_lock, tune_connection
+
+SESSION_COOKIE = "session"
+SESSION_MAX_AGE_SECONDS = 14 * 24 * 60 * 60
+SESSION_MEMORY_SIZE = 4096
+SESSION_PURGE_SECONDS = 60 * 60
+
+
+class MemorySessionStore:
+    """Process-local LRU of session data; sessions do not survive a restart or cross workers."""
+
+    def __init__(self, size: int = SESSION_MEMORY_SIZE):
+        self.size = size
+        self._sessions: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return entry[1]
+
+    def put(self, session_id: str, data: dict, expires_at: float):
+        with self._lock:
+            self._sessions[session_id] = (expires_at, data)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.size:
+                self._sessions.popitem(last=False)
+
+    def discard(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    async def load(self, session_id: str) -> Optional[dict]:
+        return self.get(session_id)
+
+    async def save(self, session_id: str, data: dict, max_age: int):
+        self.put(session_id, data, time.time() + max_age)
+
+    async def delete(self, session_id: str):
+        self.discard(session_id)
+
+
+class SQLiteSessionStore:
+    """Session data in a SQLite file shared by every worker, fronted by a per-process LRU.
+
+    All of this process's writes go through one connection, whose PRAGMA data_version only
+    moves when another worker commits; that is what drops the LRU.
+    """
+
+    def __init__(self, path: Union[str, Path], memory_size: int = SESSION_MEMORY_SIZE):
+        self.path = path
+        self.memory = MemorySessionStore(memory_size)
+        self._pool = ConnectionPool(path, name="sessions")
+        self._purged_at = 0.0
+        with schema_lock(path), self._pool.get() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_sessions_expires_at ON sessions (expires_at)")
+            conn.commit()
+        self._writer = sqlite3.connect(
+            path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, check_same_thread=False, factory=TimedConnection
+        )
+        self._writer.metrics_db = "sessions"
+        tune_connection(self._writer)
+        self._write_lock = threading.Lock()
+        self._seen_version = self._data_version()
+
+    def _data_version(self) -> int:
+        return self._writer.execute("PRAGMA data_version").fetchone()[0]
+
+    def _changed_elsewhere(self) -> bool:
+        # Runs on the event loop, so never wait for a write in progress; the next request checks again.
+        if not self._write_lock.acquire(blocking=False):
+            return False
+        try:
+            current = self._data_version()
+            changed = current != self._seen_version
+            self._seen_version = current
+            return changed
+        finally:
+            self._write_lock.release()
+
+    def _read(self, session_id: str) -> Optional[tuple[float, dict]]:
+        row = self._pool.get().execute(
+            "SELECT data, expires_at FROM sessions WHERE id = ? AND expires_at > ?",
+            (session_id, time.time()),
+        ).fetchone()
+        return (row["expires_at"], json.loads(row["data"])) if row else None
+
+    def _write(self, session_id: str, data: dict, expires_at: float):
+        now = time.time()
+        with self._write_lock, self._writer as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(data, ensure_ascii=False), expires_at),
+            )
+            if now - self._purged_at >= SESSION_PURGE_SECONDS:
+                self._purged_at = now
+                conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+
+    def _remove(self, session_id: str):
+        with self._write_lock, self._writer as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    async def load(self, session_id: str) -> Optional[dict]:
+        if self._changed_elsewhere():
+            self.memory.clear()
+        data = self.memory.get(session_id)
+        if data is not None:
+            return data
+        entry = await run_in_threadpool(self._read, session_id)
+        if entry is None:
+            return None
+        self.memory.put(session_id, entry[1], entry[0])
+        return entry[1]
+
+    async def save(self, session_id: str, data: dict, max_age: int):
+        expires_at = time.time() + max_age
+        await run_in_threadpool(self._write, session_id, data, expires_at)
+        self.memory.put(session_id, data, expires_at)
+
+    async def delete(self, session_id: str):
+        self.memory.discard(session_id)
+        await run_in_threadpool(self._remove, session_id)
+
+
+def make_session_store(backend: str, path: Union[str, Path]):
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore(path)
+    raise ValueError(f"Unknown session backend: {backend}")
+
+
+class ServerSessionMiddleware:
+    """Drop-in replacement for Starlette's SessionMiddleware that keeps session data in a store.
+
+    The cookie only carries a signed random id, so its size and verification cost do not
+    depend on what the session holds. Any object with async ``load``, ``save`` and
+    ``delete`` methods can serve as the store.
+    """
+
+    def __init__(self, app, secret_key: str, store, max_age: int = SESSION_MAX_AGE_SECONDS):
+        self.app = app
+        self.store = store
+        self.max_age = max_age
+        self.signer = TimestampSigner(secret_key)
+
+    def _session_id(self, scope) -> Optional[str]:
+        cookie = HTTPConnection(scope).cookies.get(SESSION_COOKIE)
+        if not cookie:
+            return None
+        try:
+            return self.signer.unsign(cookie, max_age=self.max_age).decode("utf-8")
+        except BadSignature:
+            return None
+
+    def _cookie(self, value: str, max_age: int) -> str:
+        return f"{SESSION_COOKIE}={value}; path=/; Max-Age={max_age}; httponly; samesite=lax"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        session_id = self._session_id(scope)
+        data = await self.store.load(session_id) if session_id else None
+        scope["session"] = dict(data) if data else {}
+        loaded = json.dumps(data, sort_keys=True) if data else None
+
+        async def send_with_session(message):
+            if message["type"] == "http.response.start":
+                session = scope["session"]
+                if session:
+                    if json.dumps(session, sort_keys=True) != loaded:
+                        target = session_id
+                        # A new login gets a new id so a cookie issued before it cannot ride along.
+                        if data is None or session.get("user") != data.get("user"):
+                            if data is not None:
+                                await self.store.delete(session_id)
+                            target = secrets.token_urlsafe(32)
+                            signed = self.signer.sign(target).decode("utf-8")
+                            MutableHeaders(scope=message).append("Set-Cookie", self._cookie(signed, self.max_age))
+                        await self.store.save(target, session, self.max_age)
+                elif session_id is not None:
+                    if data is not None:
+                        await self.store.delete(session_id)
+                    MutableHeaders(scope=message).append("Set-Cookie", self._cookie("null", 0))
+            await send(message)
+
+        await self.app(scope, receive, send_with_session)
@@ -0,0 +1,202 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import re
+import shutil
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+
+ASSETS_DIR = Path(__file__).with_name("assets")
+BUILD_DIR = Path(__file__).with_name("static")
+MANIFEST_NAME = "manifest.json"
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".json"}
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png"}
+IMAGE_WIDTHS = (320, 640, 960, 1280)
+IMAGE_SAVE_OPTIONS = {
+    ".jpg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+    ".jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+    ".png": {"format": "PNG", "optimize": True},
+}
+MODERN_IMAGE_FORMATS = (
+    ("image/avif", ".avif", {"format": "AVIF", "quality": 60}),
+    ("image/webp", ".webp", {"format": "WEBP", "quality": 80}),
+)
+CONTENT_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+CSS_STATIC_URL = re.compile(r"""url\((['"]?)/static/([^)'"]+)\1\)""")
+
+mimetypes.add_type("image/avif", ".avif")
+mimetypes.add_type("image/webp", ".webp")
+
+
+def _hashed_name(name: str, data: bytes) -> str:
+    path = Path(name)
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    return f"{path.stem}.{digest}{path.suffix}"
+
+
+def _write_compressed(path: Path, data: bytes) -> None:
+    path.with_name(path.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        path.with_name(path.name + ".br").write_bytes(brotli.compress(data, quality=11))
+
+
+def _write_modern_formats(image, path: Path) -> None:
+    for _mime, suffix, options in MODERN_IMAGE_FORMATS:
+        if not features.check(options["format"].lower()):
+            continue
+        variant = path.with_name(path.name + suffix)
+        image.save(variant, **options)
+        if variant.stat().st_size >= path.stat().st_size:
+            variant.unlink()
+
+
+def _write_image_variants(target: Path, source: Path, hashed: str) -> List[list]:
+    stem, suffix = hashed[: -len(source.suffix)], source.suffix.lower()
+    options = IMAGE_SAVE_OPTIONS[suffix]
+    entries: List[list] = []
+
+    with Image.open(source) as image:
+        image.load()
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        for width in (w for w in IMAGE_WIDTHS if w < image.width):
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+            name = f"{stem}-{width}w{suffix}"
+            resized.save(target / name, **options)
+            _write_modern_formats(resized, target / name)
+            entries.append([width, name])
+
+        _write_modern_formats(image, target / hashed)
+        entries.append([image.width, hashed])
+
+    return entries
+
+
+def build(source: Path = ASSETS_DIR, target: Path = BUILD_DIR) -> dict:
+    if target.exists():
+        shutil.rmtree(target)
+    target.mkdir(parents=True)
+
+    files: Dict[str, str] = {}
+    srcsets: Dict[str, List[list]] = {}
+    sources = sorted(path for path in source.iterdir() if path.is_file())
+
+    # Images first, so stylesheets can be rewritten to their hashed names.
+    for path in (p for p in sources if p.suffix.lower() in IMAGE_SUFFIXES):
+        data = path.read_bytes()
+        hashed = _hashed_name(path.name, data)
+        (target / hashed).write_bytes(data)
+        files[path.name] = hashed
+        if Image is not None:
+            srcsets[path.name] = _write_image_variants(target, path, hashed)
+
+    for path in (p for p in sources if p.suffix.lower() not in IMAGE_SUFFIXES):
+        data = path.read_bytes()
+        if path.suffix == ".css":
+            data = CSS_STATIC_URL.sub(
+                lambda m: f"url({m.group(1)}/static/{files.get(m.group(2), m.group(2))}{m.group(1)})",
+                data.decode("utf-8"),
+            ).encode("utf-8")
+        hashed = _hashed_name(path.name, data)
+        (target / hashed).write_bytes(data)
+        files[path.name] = hashed
+        if path.suffix in COMPRESSIBLE_SUFFIXES:
+            _write_compressed(target / hashed, data)
+
+    manifest = {"files": files, "srcsets": srcsets}
+    (target / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    return manifest
+
+
+class AssetManifest:
+    def __init__(self, build_dir: Path = BUILD_DIR):
+        self.build_dir = build_dir
+        path = build_dir / MANIFEST_NAME
+        manifest = json.loads(path.read_text(encoding="utf-8")) if path.is_file() else {}
+        self.files: Dict[str, str] = manifest.get("files", {})
+        self.srcsets: Dict[str, List[list]] = manifest.get("srcsets", {})
+        self.hashed = set(self.files.values())
+        for entries in self.srcsets.values():
+            self.hashed.update(name for _width, name in entries)
+
+    @property
+    def built(self) -> bool:
+        return bool(self.files)
+
+    def url(self, name: str) -> str:
+        return f"/static/{self.files.get(name, name)}"
+
+    def srcset(self, name: str) -> str:
+        return ", ".join(f"/static/{file} {width}w" for width, file in self.srcsets.get(name, []))
+
+
+class AssetFiles(StaticFiles):
+    def __init__(self, manifest: AssetManifest):
+        super().__init__(directory=manifest.build_dir)
+        self.manifest = manifest
+
+    async def get_response(self, path: str, scope) -> Response:
+        immutable = path in self.manifest.hashed
+        path = self.manifest.files.get(path, path)
+        headers = Headers(scope=scope)
+        suffix = Path(path).suffix.lower()
+
+        candidates: List[tuple] = []
+        if suffix in IMAGE_SUFFIXES:
+            accept = headers.get("accept", "")
+            candidates = [(path + ext, None) for mime, ext, _ in MODERN_IMAGE_FORMATS if mime in accept]
+            vary = "Accept"
+        elif suffix in COMPRESSIBLE_SUFFIXES:
+            accepted = {token.split(";")[0].strip() for token in headers.get("accept-encoding", "").split(",")}
+            candidates = [(path + ext, encoding) for encoding, ext in CONTENT_ENCODINGS if encoding in accepted]
+            vary = "Accept-Encoding"
+        else:
+            vary = None
+
+        response: Optional[Response] = None
+        for candidate, encoding in candidates:
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, candidate)
+            if stat_result is not None:
+                response = self.file_response(full_path, stat_result, scope)
+                if encoding is not None:
+                    response.headers["Content-Encoding"] = encoding
+                    response.headers["Content-Type"] = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                break
+
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+            if vary is not None:
+                response.headers["Vary"] = vary
+        return response
+
+
+if __name__ == "__main__":
+    result = build()
+    print(f"Built {len(result['files'])} assets into {BUILD_DIR}", file=sys.stderr)